@@ -0,0 +1,221 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import re
+import resource
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+import fuzzer
+
+DEFAULTS = {'jobs' : os.cpu_count() or 1, 'timeout' : fuzzer.Fuzzer.DEFAULTS['timeout'], 'memory_limit' : 4096, 'output' : 'output/batch/', 'grace' : 60}
+FIELDS = ['task', 'program', 'status', 'seconds', 'evaluations', 'testcases', 'line_coverage', 'branch_coverage', 'stop_reason', 'output_dir', 'error']
+# extensions of files that list tasks, one path or glob per line relative to the file
+LIST_EXTENSIONS = ('.txt', '.set', '.list')
+
+
+def _input_files(path):
+    # the programs of an sv-benchmarks task definition, without depending on a yaml parser
+    with open(path) as f:
+        text = f.read()
+    match = re.search(r'^input_files:[ \t]*(.*)$((?:\n[ \t]*-.*)*)', text, re.MULTILINE)
+    if match is None:
+        return []
+    values = [match.group(1)] + [line.strip()[1:] for line in match.group(2).split('\n') if line.strip()]
+    files = [value.strip().strip('\'"') for value in values]
+    return [os.path.join(os.path.dirname(path), f) for f in files if f]
+
+def expand_tasks(patterns, base = ''):
+    programs = []
+    for pattern in patterns:
+        pattern = os.path.join(base, pattern)
+        paths = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in paths:
+            if path.endswith(LIST_EXTENSIONS):
+                with open(path) as f:
+                    lines = [line.split('#', 1)[0].strip() for line in f]
+                programs += expand_tasks([line for line in lines if line], os.path.dirname(path))
+            elif path.endswith('.yml'):
+                programs += _input_files(path)
+            else:
+                programs.append(path)
+    return [os.path.normpath(path) for path in programs]
+
+def run_task(path, fuzzer_args, task_dir, scratch_dir, build_cache, timeout):
+    # runs in a worker process, the output of the fuzzer and of gcc goes to a file of the task
+    os.makedirs(task_dir, exist_ok=True)
+    result = dict(task = path, program = os.path.basename(path), output_dir = task_dir)
+    start = time.time()
+    with open(task_dir + 'stdout.txt', 'w') as log:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        task_fuzzer = None
+        try:
+            sys.argv = ['fuzzer.py', *fuzzer_args, path]
+            kwargs = fuzzer.parse_argv_to_fuzzer_kwargs()
+            kwargs.update(output_dir = task_dir + 'output/', log_dir = task_dir + 'logs/', build_cache = build_cache, scratch_dir = scratch_dir, timeout = timeout)
+            fuzzer._profiler.reset()
+            task_fuzzer = fuzzer.Fuzzer(**kwargs)
+            task_fuzzer.generate_testsuite()
+            line, branch = task_fuzzer.last_report()
+            task_fuzzer.maybe_write_xml_tests()
+            result.update(status = 'done', evaluations = task_fuzzer.cma_es.evaluations, testcases = len(task_fuzzer.get_total_samples()),
+                line_coverage = line, branch_coverage = branch, stop_reason = task_fuzzer._stop())
+        except MemoryError:
+            result.update(status = 'memory')
+        except SystemExit as e:
+            result.update(status = 'error', error = str(e.code))
+        except Exception as e:
+            result.update(status = 'error', error = '%s: %s' % (e.__class__.__name__, e))
+        finally:
+            if task_fuzzer is not None:
+                task_fuzzer.close()
+            sys.stdout.flush()
+            sys.stderr.flush()
+    result['seconds'] = round(time.time() - start, 2)
+    return result
+
+def _worker(tasks, results, memory_limit):
+    # the modules are imported once per worker. the worker leads its own process group, so a task that
+    # is over its time is killed together with the programs it runs
+    os.setpgrp()
+    if memory_limit:
+        limit = memory_limit * 2 ** 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    for index, args in iter(tasks.get, None):
+        results.put((index, run_task(*args)))
+
+class BatchPool:
+    def __init__(self, jobs, memory_limit):
+        self._memory_limit = memory_limit
+        self._results = multiprocessing.Queue()
+        self._workers = [self._start_worker() for _ in range(jobs)]
+
+    def _start_worker(self):
+        tasks = multiprocessing.Queue()
+        # not a daemon, so that the fuzzer of a task can start islands. close and run_batch stop the workers
+        process = multiprocessing.Process(target=_worker, args=(tasks, self._results, self._memory_limit))
+        process.start()
+        return dict(process = process, tasks = tasks, index = None, args = None, deadline = None)
+
+    @staticmethod
+    def _kill(worker):
+        try:
+            os.killpg(worker['process'].pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        worker['process'].join()
+
+    def run(self, tasks, deadline):
+        # yields (index, result) as the tasks finish, a task that is over its deadline or whose worker died is reported by its status
+        pending = list(enumerate(tasks))[::-1]
+        running = 0
+        while pending or running:
+            for worker in self._workers:
+                if worker['index'] is None and pending:
+                    worker['index'], worker['args'] = pending.pop()
+                    worker['deadline'] = time.time() + deadline
+                    worker['tasks'].put((worker['index'], worker['args']))
+                    running += 1
+
+            try:
+                index, result = self._results.get(timeout=1)
+            except queue.Empty:
+                index, result = None, None
+            for worker in self._workers:
+                # a result that comes after its task was killed was already reported
+                if index is not None and worker['index'] == index:
+                    worker['index'] = None
+                    running -= 1
+                    yield index, result
+
+            for i, worker in enumerate(self._workers):
+                if worker['index'] is None:
+                    continue
+                if worker['process'].is_alive() and time.time() < worker['deadline']:
+                    continue
+                status = 'timeout' if worker['process'].is_alive() else 'crashed'
+                self._kill(worker)
+                path, _, task_dir = worker['args'][:3]
+                result = dict(task = path, program = os.path.basename(path), output_dir = task_dir, status = status, seconds = round(time.time() - worker['deadline'] + deadline, 2))
+                if status == 'crashed':
+                    result['error'] = 'exit code %s' % worker['process'].exitcode
+                running -= 1
+                yield worker['index'], result
+                self._workers[i] = self._start_worker()
+
+    def close(self):
+        for worker in self._workers:
+            worker['tasks'].put(None)
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                self._kill(worker)
+
+def run_batch(programs, fuzzer_args, output_dir, jobs, timeout, memory_limit, build_cache):
+    # all tasks share the build cache and a scratch directory, in which each task keeps its .gcda files in its own directory
+    os.makedirs(output_dir, exist_ok=True)
+    scratch_base = fuzzer.CoverageMap.SHM_DIR if os.path.isdir(fuzzer.CoverageMap.SHM_DIR) else output_dir
+    scratch_dir = tempfile.mkdtemp(dir=scratch_base, prefix='fuzzer_batch_') + '/'
+    tasks = [(path, fuzzer_args, '%stasks/%d_%s/' % (output_dir, i, os.path.basename(path)[:-2]), scratch_dir, build_cache, timeout) for i, path in enumerate(programs)]
+
+    results = [None] * len(tasks)
+    pool = BatchPool(jobs, memory_limit)
+    try:
+        with open(output_dir + 'results.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            for index, result in pool.run(tasks, timeout + DEFAULTS['grace']):
+                results[index] = result
+                writer.writerow(result)
+                f.flush()
+                print('[%d/%d] %s: %s %s' % (sum(r is not None for r in results), len(tasks), result['task'], result['status'], result.get('branch_coverage', '')), file=sys.stderr)
+    finally:
+        pool.close()
+        # the directories of the tasks that were killed are left behind
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    with open(output_dir + 'results.json', 'w') as f:
+        json.dump(dict(fuzzer_args = fuzzer_args, timeout = timeout, memory_limit = memory_limit, tasks = results), f, indent = 2)
+    return results
+
+def main():
+    arg_parser = argparse.ArgumentParser(description = 'fuzz many programs with a pool of worker processes, fuzzer options can be given after --')
+    arg_parser.add_argument('tasks', nargs = '+', type = str,
+        help = 'programs, globs, sv-benchmarks .yml tasks or files that list them (.txt, .set, .list)')
+    arg_parser.add_argument('-j', '--jobs', type = int, default = DEFAULTS['jobs'],
+        help = 'number of worker processes')
+    arg_parser.add_argument('-t', '--timeout', type = int, default = DEFAULTS['timeout'],
+        help = 'timeout of the fuzzer for each task in seconds, a task is killed %d seconds after it' % DEFAULTS['grace'])
+    arg_parser.add_argument('-m', '--memory_limit', type = int, default = DEFAULTS['memory_limit'],
+        help = 'address space limit of each worker and the programs it runs in MB, 0 for no limit')
+    arg_parser.add_argument('-od', '--output_dir', type = str, default = DEFAULTS['output'],
+        help = 'directory for results.csv, results.json and the output and logs of each task')
+    arg_parser.add_argument('-bc', '--build_cache', type = str, default = fuzzer.Program.DEFAULT_DIRS['build_cache'],
+        help = 'directory for compiled programs that all tasks share')
+    # the tasks are positional, so the fuzzer options are split off at -- before parsing
+    argv = sys.argv[1:]
+    split = argv.index('--') if '--' in argv else len(argv)
+    args = arg_parser.parse_args(argv[:split])
+    fuzzer_args = argv[split + 1:]
+
+    output_dir = args.output_dir if args.output_dir.endswith('/') else args.output_dir + '/'
+    programs = expand_tasks(args.tasks)
+    if not programs:
+        exit('ERROR: No tasks found!')
+
+    results = run_batch(programs, fuzzer_args, output_dir, max(args.jobs, 1), args.timeout, args.memory_limit, args.build_cache)
+    statuses = [result['status'] for result in results]
+    print(', '.join('%s: %d' % (status, statuses.count(status)) for status in sorted(set(statuses))), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
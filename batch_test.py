@@ -0,0 +1,59 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import batch
+
+# copies of a program are fuzzed one after another by the same worker process, so each task has to get the
+# whole timeout of its own. usage: python3 batch_test.py examples/test.c [-n COPIES] [-t TIMEOUT] [-- fuzzer options]
+arg_parser = argparse.ArgumentParser()
+arg_parser.add_argument('program', type = str,
+    help = 'program that is copied into the tasks')
+arg_parser.add_argument('-n', '--copies', type = int, default = 3,
+    help = 'number of tasks')
+arg_parser.add_argument('-t', '--timeout', type = int, default = 6,
+    help = 'timeout of the fuzzer for each task in seconds')
+argv = sys.argv[1:]
+split = argv.index('--') if '--' in argv else len(argv)
+args = arg_parser.parse_args(argv[:split])
+fuzzer_args = argv[split + 1:]
+
+def assert_task_is_done(result):
+    if result['status'] != 'done':
+        exit('Test Failed: task %s ended with %s (%s)' % (result['task'], result['status'], result.get('error', '')))
+
+def assert_task_has_evaluations(result):
+    if not result['evaluations']:
+        exit('Test Failed: task %s made no evaluations' % result['task'])
+
+def assert_scratch_dirs_are_removed(scratch_dirs):
+    # the programs remove their .gcda directories when they are closed
+    left = [d for d in os.listdir(batch.fuzzer.CoverageMap.SHM_DIR) if d.startswith('fuzzer_')] if os.path.isdir(batch.fuzzer.CoverageMap.SHM_DIR) else []
+    if set(left) - scratch_dirs:
+        exit('Test Failed: scratch directories %s are left behind' % sorted(set(left) - scratch_dirs))
+
+
+def test():
+    shm_dir = batch.fuzzer.CoverageMap.SHM_DIR
+    scratch_dirs = set(d for d in os.listdir(shm_dir) if d.startswith('fuzzer_')) if os.path.isdir(shm_dir) else set()
+    task_dir = tempfile.mkdtemp(prefix='batch_test_') + '/'
+    try:
+        programs = []
+        for i in range(args.copies):
+            programs.append('%s%d_%s' % (task_dir, i, os.path.basename(args.program)))
+            shutil.copy(args.program, programs[-1])
+        results = batch.run_batch(programs, fuzzer_args, task_dir + 'output/', 1, args.timeout, batch.DEFAULTS['memory_limit'], batch.fuzzer.Program.DEFAULT_DIRS['build_cache'])
+    finally:
+        shutil.rmtree(task_dir, ignore_errors=True)
+
+    for result in results:
+        assert_task_is_done(result)
+        assert_task_has_evaluations(result)
+    assert_scratch_dirs_are_removed(scratch_dirs)
+    print('Test Passed')
+
+
+if __name__ == "__main__":
+    test()
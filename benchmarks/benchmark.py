@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import corpus
+
+DEFAULTS = {'seed' : 700, 'max_evaluations' : 2000, 'output' : 'output/benchmarks/', 'tolerance' : 0.2}
+TARGETS = ['examples/test.c']
+
+
+def run_target(path, fuzzer_args):
+    # runs in its own process, so that _time_log and the peak rss only belong to this target. the peak rss of the
+    # children is not reported, a forked child starts with the rss of the fuzzer and ru_maxrss keeps the largest child
+    import fuzzer
+
+    class BenchmarkFuzzer(fuzzer.Fuzzer):
+        def __init__(self, **kwargs):
+            super(BenchmarkFuzzer, self).__init__(**kwargs)
+            self.start = None
+            self.curve = []
+
+        def check_optimized(self, sample, check, evaluation = None, input_bytes = None):
+            coverage = self.get_total_coverage()
+            try:
+                return super(BenchmarkFuzzer, self).check_optimized(sample, check, evaluation, input_bytes)
+            finally:
+                if self.get_total_coverage() > coverage:
+                    self.curve.append((round(time.time() - self.start, 4), self.cma_es.evaluations, round(self.get_total_coverage(), 2)))
+
+    sys.argv = ['fuzzer.py', *fuzzer_args, path]
+    kwargs = fuzzer.parse_argv_to_fuzzer_kwargs()
+    benchmark_fuzzer = BenchmarkFuzzer(**kwargs)
+    benchmark_fuzzer.start = time.time()
+    benchmark_fuzzer.generate_testsuite()
+    seconds = time.time() - benchmark_fuzzer.start
+
+    evaluations = benchmark_fuzzer.cma_es.evaluations
+    return dict(target = path, evaluations = evaluations, executions = benchmark_fuzzer._cache.misses, seconds = round(seconds, 4),
+        evals_per_sec = round(evaluations / seconds, 2) if seconds > 0 else 0, coverage = round(benchmark_fuzzer.get_total_coverage(), 2),
+        stop_reason = benchmark_fuzzer._stop(), curve = benchmark_fuzzer.curve, time_log = {k: round(v, 4) for k, v in fuzzer._time_log.items()},
+        time_to_first_evaluation = fuzzer._profiler.first_evaluation,
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def run_benchmark(targets, seed, max_evaluations, output_dir, fuzzer_args):
+    results = []
+    os.makedirs(output_dir, exist_ok=True)
+    for target in targets:
+        args = ['-s', str(seed), '-me', str(max_evaluations), '-od', output_dir + 'fuzzer/', '-ld', output_dir + 'logs/', *fuzzer_args]
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run_target', target, '--', *args], capture_output=True, cwd=REPO_DIR)
+        try:
+            result = json.loads(output.stdout.decode().splitlines()[-1])
+        except (IndexError, ValueError):
+            result = dict(target = target, error = output.stderr.decode()[-2000:])
+        print('%s: %s evals/sec' % (target, result.get('evals_per_sec', 'error')), file=sys.stderr)
+        results.append(result)
+    return dict(seed = seed, max_evaluations = max_evaluations, fuzzer_args = fuzzer_args, targets = results)
+
+def compare(report, baseline, tolerance):
+    # evals/sec of a target must not drop by more than the tolerance against the baseline report
+    regressions = []
+    baseline_results = {result['target']: result for result in baseline['targets'] if 'evals_per_sec' in result}
+    for result in report['targets']:
+        previous = baseline_results.get(result['target'])
+        if previous is None:
+            continue
+        if 'evals_per_sec' not in result or result['evals_per_sec'] < (1 - tolerance) * previous['evals_per_sec']:
+            regressions.append((result['target'], previous['evals_per_sec'], result.get('evals_per_sec')))
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description = 'evaluation throughput of the fuzzer on examples/test.c and a generated corpus, fuzzer options can be given after --')
+    arg_parser.add_argument('-s', '--seed', type = int, default = DEFAULTS['seed'],
+        help = 'seed of the fuzzer for each target')
+    arg_parser.add_argument('-me', '--max_evaluations', type = int, default = DEFAULTS['max_evaluations'],
+        help = 'maximum evaluations for each target')
+    arg_parser.add_argument('-od', '--output_dir', type = str, default = DEFAULTS['output'],
+        help = 'directory for the generated corpus, compiled programs and logs')
+    arg_parser.add_argument('-t', '--targets', type = str, nargs = '*',
+        help = 'programs to run instead of examples/test.c and the generated corpus')
+    arg_parser.add_argument('-r', '--report', type = str,
+        help = 'file for the json report, default is stdout')
+    arg_parser.add_argument('-b', '--baseline', type = str,
+        help = 'json report of an earlier run, exits with 1 if evals/sec of a target dropped by more than the tolerance')
+    arg_parser.add_argument('-tol', '--tolerance', type = float, default = DEFAULTS['tolerance'],
+        help = 'allowed relative drop of evals/sec against the baseline')
+    arg_parser.add_argument('--run_target', type = str, help = argparse.SUPPRESS)
+    arg_parser.add_argument('fuzzer_args', nargs = argparse.REMAINDER)
+    args = arg_parser.parse_args()
+    fuzzer_args = args.fuzzer_args[1:] if args.fuzzer_args[:1] == ['--'] else args.fuzzer_args
+
+    os.chdir(REPO_DIR)
+    if args.run_target is not None:
+        print(json.dumps(run_target(args.run_target, fuzzer_args)))
+        return
+
+    output_dir = args.output_dir if args.output_dir.endswith('/') else args.output_dir + '/'
+    targets = args.targets
+    if not targets:
+        targets = TARGETS + [os.path.relpath(path) for path in corpus.generate(output_dir + 'corpus/')]
+    report = run_benchmark(targets, args.seed, args.max_evaluations, output_dir, fuzzer_args)
+
+    if args.report is None:
+        print(json.dumps(report, indent = 2))
+    else:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent = 2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for target, previous, current in regressions:
+            print('regression: %s %s -> %s evals/sec' % (target, previous, current), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import random
+
+# name, nondet inputs, branches, statements per branch, type of the inputs
+CORPUS = [
+    ('small_char', 4, 8, 1, 'char'),
+    ('medium_char', 16, 64, 2, 'char'),
+    ('large_char', 64, 256, 4, 'char'),
+    ('medium_int', 16, 64, 2, 'int'),
+    ('long_input', 256, 64, 1, 'char'),
+]
+
+# the same corpus is generated on every run, the programs only depend on their parameters
+SEED = 2021
+
+CONSTANTS = {'char' : (-128, 127), 'int' : (-1000, 1000)}
+
+def _condition(rng, variables, input_type):
+    low, high = CONSTANTS[input_type]
+    x = rng.choice(variables)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return '%s %s %d' % (x, rng.choice(['<', '<=', '>', '>=']), rng.randint(low, high))
+    elif kind == 1:
+        return '%s == %d' % (x, rng.randint(low, high))
+    elif kind == 2 and len(variables) > 1:
+        return '%s %s %s' % (x, rng.choice(['<', '>', '==']), rng.choice([y for y in variables if y != x]))
+    return '%s %% %d == %d' % (x, rng.randint(2, 7), rng.randint(0, 1))
+
+def _body(rng, statements, indent):
+    return ''.join('%ss += %d;\n' % (indent, rng.randint(1, 9)) for _ in range(statements))
+
+def generate_program(name, inputs, branches, statements, input_type):
+    rng = random.Random('%s-%d' % (name, SEED))
+    variables = ['x%d' % i for i in range(inputs)]
+    lines = ['extern %s __VERIFIER_nondet_%s();\n' % (input_type, input_type), 'extern void __VERIFIER_error();\n', '\n', 'int main() {\n']
+    lines += ['    %s %s = __VERIFIER_nondet_%s();\n' % (input_type, x, input_type) for x in variables]
+    lines.append('    int s = 0;\n')
+
+    depth = 0
+    for _ in range(branches):
+        indent = '    ' * (depth + 1)
+        lines.append('%sif (%s) {\n' % (indent, _condition(rng, variables, input_type)))
+        lines.append(_body(rng, statements, indent + '    '))
+        if depth < 3 and rng.random() < 0.3:
+            # the next branches are nested in this one, they are only reached after it is covered
+            depth += 1
+            continue
+        if rng.random() < 0.3:
+            lines.append('%s} else {\n' % indent)
+            lines.append(_body(rng, statements, indent + '    '))
+        lines.append('%s}\n' % indent)
+        while depth > 0 and rng.random() < 0.5:
+            depth -= 1
+            lines.append('    ' * (depth + 1) + '}\n')
+    while depth > 0:
+        depth -= 1
+        lines.append('    ' * (depth + 1) + '}\n')
+
+    lines.append('    for (int i = 0; i < (%s & 7); i++) {\n        s += i;\n    }\n' % variables[0])
+    lines.append('    if (s == %d) {\n        __VERIFIER_error();\n    }\n' % rng.randint(0, 100))
+    lines.append('    return 0;\n}\n')
+    return ''.join(lines)
+
+def generate(directory):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, inputs, branches, statements, input_type in CORPUS:
+        path = os.path.join(directory, name + '.c')
+        program = generate_program(name, inputs, branches, statements, input_type)
+        # keep the file untouched when it is already there, so the build cache can be reused
+        if not os.path.isfile(path) or open(path).read() != program:
+            with open(path, 'w') as f:
+                f.write(program)
+        paths.append(path)
+    return paths
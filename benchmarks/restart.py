@@ -0,0 +1,76 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import cma
+import fuzzer
+
+DEFAULTS = {'restarts' : 600, 'batches' : 15, 'dimensions' : [2, 16, 128], 'popsizes' : [10, 40, 160]}
+
+
+def time_batch(restart, restarts):
+    gc.collect()
+    start = time.process_time()
+    for _ in range(restarts):
+        restart()
+    return (time.process_time() - start) / restarts
+
+def compare(restarts, batches, *functions):
+    # the batches of the functions alternate and the cpu time of the best batch is kept, the others are slowed down by other processes
+    times = [[] for _ in functions]
+    for _ in range(batches):
+        for i, function in enumerate(functions):
+            times[i].append(time_batch(function, restarts // batches))
+    return [round(1000 * min(t), 4) for t in times]
+
+def run_benchmark(dimensions, popsizes, restarts, batches):
+    # cost of one restart of CMA_ES against a new CMAEvolutionStrategy with the options that the fuzzer passes
+    results = []
+    for dimension in dimensions:
+        for popsize in popsizes:
+            cma_es = fuzzer.CMA_ES(700, dimension, popsize, popsize, fuzzer.CMA_ES.DEFAULTS['max_gens'], fuzzer.CMA_ES.DEFAULTS['popsize_scale'], fuzzer.CMA_ES.DEFAULTS['max_evaluations'])
+            options = dict(popsize = popsize, verb_disp = 0, verb_log = 0, bounds = fuzzer.CMA_ES.DEFAULTS['bounds'], CMA_stds = None, fixed_variables = None)
+            x0 = fuzzer.CMA_ES.DEFAULTS['x0'] * dimension
+            es = [None]
+
+            def construct():
+                # like init_cmaes did before, the strategy is kept until the next restart
+                es[0] = cma.CMAEvolutionStrategy(x0, fuzzer.CMA_ES.DEFAULTS['sigma0'], inopts = dict(options, seed = random.randint(10, 10000)))
+                es[0].result
+
+            construction, restart = compare(restarts, batches, construct, cma_es.init_cmaes)
+            results.append(dict(dimension = dimension, popsize = popsize, construction_ms = construction, restart_ms = restart))
+            print('dimension %d popsize %d: %s -> %s ms' % (dimension, popsize, construction, restart), file=sys.stderr)
+    return dict(restarts = restarts, batches = batches, results = results)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description = 'time of a restart of CMA_ES against the construction of a new CMAEvolutionStrategy')
+    arg_parser.add_argument('-n', '--restarts', type = int, default = DEFAULTS['restarts'],
+        help = 'restarts for each dimension and population size')
+    arg_parser.add_argument('-b', '--batches', type = int, default = DEFAULTS['batches'],
+        help = 'batches the restarts are divided into')
+    arg_parser.add_argument('-d', '--dimensions', type = int, nargs = '+', default = DEFAULTS['dimensions'],
+        help = 'dimensions of the samples')
+    arg_parser.add_argument('-p', '--popsizes', type = int, nargs = '+', default = DEFAULTS['popsizes'],
+        help = 'population sizes')
+    arg_parser.add_argument('-r', '--report', type = str,
+        help = 'file for the json report, default is stdout')
+    args = arg_parser.parse_args()
+
+    report = run_benchmark(args.dimensions, args.popsizes, args.restarts, args.batches)
+    if args.report is None:
+        print(json.dumps(report, indent = 2))
+    else:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent = 2)
+
+if __name__ == "__main__":
+    main()
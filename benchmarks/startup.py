@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+DEFAULTS = {'repeat' : 10, 'output' : 'output/benchmarks/startup/'}
+# a program without inputs, the fuzzer stops right after compiling it, so the run is mostly the cold start
+NO_INPUT_PROGRAM = 'int main() {\n    return 0;\n}\n'
+# each statement is timed in a fresh interpreter, after the imports it depends on
+IMPORTS = [
+    ('numpy', '', 'import numpy'),
+    ('cma', 'import numpy', 'import cma; cma.CMAEvolutionStrategy'),
+    ('fuzzer', '', 'import fuzzer'),
+]
+
+
+def time_import(setup, statement):
+    code = '%s\nimport time\nstart = time.perf_counter()\n%s\nprint(time.perf_counter() - start)' % (setup, statement)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, cwd=REPO_DIR, check=True)
+    return float(output.stdout.decode().split()[-1])
+
+def time_run(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'fuzzer.py', *args], capture_output=True, cwd=REPO_DIR, check=True)
+    return time.perf_counter() - start
+
+def summary(times):
+    return dict(median_ms = round(1000 * statistics.median(times), 2), min_ms = round(1000 * min(times), 2), max_ms = round(1000 * max(times), 2))
+
+def run_benchmark(repeat, output_dir):
+    report = dict(python = sys.version.split()[0], repeat = repeat)
+    for name, setup, statement in IMPORTS:
+        report['import_' + name] = summary([time_import(setup, statement) for _ in range(repeat)])
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = output_dir + 'no_input.c'
+    with open(path, 'w') as f:
+        f.write(NO_INPUT_PROGRAM)
+    args = ['-od', output_dir + 'fuzzer/', '-ld', output_dir + 'logs/', path]
+    # the first run fills the build cache, so the timed runs do not include gcc
+    time_run(args)
+    report['run_no_input'] = summary([time_run(args) for _ in range(repeat)])
+    return report
+
+def main():
+    arg_parser = argparse.ArgumentParser(description = 'cold start of the fuzzer: import times in fresh interpreters and whole runs on a program without inputs')
+    arg_parser.add_argument('-n', '--repeat', type = int, default = DEFAULTS['repeat'],
+        help = 'fresh interpreters for each measurement')
+    arg_parser.add_argument('-od', '--output_dir', type = str, default = DEFAULTS['output'],
+        help = 'directory for the program without inputs, its compiled program and logs')
+    arg_parser.add_argument('-r', '--report', type = str,
+        help = 'file for the json report, default is stdout')
+    args = arg_parser.parse_args()
+
+    output_dir = args.output_dir if args.output_dir.endswith('/') else args.output_dir + '/'
+    report = run_benchmark(args.repeat, os.path.join(REPO_DIR, output_dir))
+    if args.report is None:
+        print(json.dumps(report, indent = 2))
+    else:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent = 2)
+
+if __name__ == "__main__":
+    main()
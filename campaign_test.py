@@ -0,0 +1,77 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# runs whole campaigns of fuzzer.py in a process of their own. usage: python3 campaign_test.py examples/unreachable.c
+arg_parser = argparse.ArgumentParser()
+arg_parser.add_argument('program', type = str,
+    help = 'program with a small input space that ends up in the evaluation cache')
+arg_parser.add_argument('-t', '--timeout', type = int, default = 5,
+    help = 'timeout of the fuzzer in seconds')
+args = arg_parser.parse_args()
+# the compilation and the final coverage also run in the process of the fuzzer
+GRACE = 10
+
+def fuzzer_command(work_dir, *fuzzer_args):
+    return [sys.executable, 'fuzzer.py', args.program, '-od', work_dir + 'output/', '-ld', work_dir + 'logs/', *fuzzer_args]
+
+def checkpoint_path(work_dir):
+    return work_dir + 'logs/' + os.path.splitext(os.path.basename(args.program))[0] + '.checkpoint'
+
+def run_fuzzer(work_dir, *fuzzer_args):
+    start = time.time()
+    try:
+        output = subprocess.run(fuzzer_command(work_dir, *fuzzer_args), capture_output = True, timeout = args.timeout + GRACE)
+    except subprocess.TimeoutExpired:
+        exit('Test Failed: fuzzer.py %s is still running after %d seconds' % (' '.join(fuzzer_args), args.timeout + GRACE))
+    if output.returncode != 0:
+        print(output.stderr.decode())
+        exit('Test Failed: fuzzer.py %s exited with %d' % (' '.join(fuzzer_args), output.returncode))
+    return output.stdout.decode(), time.time() - start
+
+def test_timeout_with_cached_inputs(work_dir):
+    # the program reads one of the four input bytes, so soon every input is answered by the prefix cache and no program runs
+    run_fuzzer(work_dir, '-t', str(args.timeout), '-s', '3', '-is', '4')
+
+def kill_fuzzer_after_checkpoint(work_dir, *fuzzer_args):
+    process = subprocess.Popen(fuzzer_command(work_dir, *fuzzer_args), stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    start = time.time()
+    while not os.path.isfile(checkpoint_path(work_dir)) and process.poll() is None and time.time() - start < args.timeout + GRACE:
+        time.sleep(0.1)
+    process.kill()
+    process.wait()
+    if not os.path.isfile(checkpoint_path(work_dir)):
+        exit('Test Failed: fuzzer.py %s wrote no checkpoint' % ' '.join(fuzzer_args))
+
+def test_resume_from_checkpoint(work_dir):
+    # the campaign is killed once it wrote a checkpoint, continued with --resume and its checkpoint is removed at its end
+    fuzzer_args = ['-t', str(args.timeout), '-s', '3', '-ci', '1']
+    kill_fuzzer_after_checkpoint(work_dir, *fuzzer_args)
+    run_fuzzer(work_dir, *fuzzer_args, '--resume')
+    logs = ''
+    for name in os.listdir(work_dir + 'logs/'):
+        if name.endswith('.csv'):
+            with open(work_dir + 'logs/' + name) as f:
+                logs += f.read()
+    if 'resumed' not in logs:
+        exit('Test Failed: the campaign was not resumed from its checkpoint')
+    if os.path.isfile(checkpoint_path(work_dir)):
+        exit('Test Failed: the checkpoint is left behind after the campaign ended')
+
+
+def test():
+    for test_campaign in [test_timeout_with_cached_inputs, test_resume_from_checkpoint]:
+        work_dir = tempfile.mkdtemp(prefix='campaign_test_') + '/'
+        try:
+            test_campaign(work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print('Test Passed')
+
+
+if __name__ == "__main__":
+    test()
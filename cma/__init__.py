@@ -117,32 +117,72 @@ from __future__ import with_statement
 ___author__ = "Nikolaus Hansen and Petr Baudis and Youhei Akimoto"
 __license__ = "BSD 3-clause"
 
+import sys as _sys
 import warnings as _warnings
-
-# __package__ = 'cma'
-from . import purecma
-try:
-    import numpy
-    del numpy
-except ImportError:
-    _warnings.warn('Only `cma.purecma` has been imported. Install `numpy` ("pip'
+from importlib import import_module as _import_module
+from importlib.util import find_spec as _find_spec
+
+# submodules and shortcuts are imported on first access (PEP 562), e.g.
+# `cma.CMAEvolutionStrategy` only imports `evolution_strategy` and what it
+# needs, but not `fitness_functions`, `bbobbenchmarks` or `s`.
+_SUBMODULES = ('bbobbenchmarks', 'constraints_handler', 'evolution_strategy',
+               'fitness_functions', 'fitness_models', 'fitness_transformations',
+               'interfaces', 'logger', 'optimization_tools', 'purecma',
+               'recombination_weights', 'restricted_gaussian_sampler', 's',
+               'sampler', 'sigma_adaptation', 'transformations', 'utilities',
+               'wrapper')
+_SHORTCUTS = {
+    'ff': 'fitness_functions',
+    'GlueArguments': 'fitness_transformations',
+    'ScaleCoordinates': 'fitness_transformations',
+    'fmin': 'evolution_strategy',
+    'fmin2': 'evolution_strategy',
+    'fmin_con': 'evolution_strategy',
+    'CMAEvolutionStrategy': 'evolution_strategy',
+    'CMAOptions': 'evolution_strategy',
+    'cma_default_options_': 'evolution_strategy',
+    'disp': 'logger',
+    'plot': 'logger',
+    'CMADataLogger': 'logger',
+    'NoiseHandler': 'optimization_tools',
+    'BoundPenalty': 'constraints_handler',
+    'BoundTransform': 'constraints_handler',
+}
+# from . import test  # gives a warning with python -m cma.test (since Python 3.5.3?)
+test = 'type "import cma.test" to access the `test` module of `cma`'
+
+# `from cma import *` resolves these names through `__getattr__`, the same
+# names an eager import of the package used to export
+__all__ = ['constraints_handler', 'evolution_strategy', 'fitness_functions',
+           'fitness_transformations', 'interfaces', 'logger',
+           'optimization_tools', 'purecma', 's', 'sampler',
+           'sigma_adaptation', 'transformations', 'utilities',
+           'test'] + list(_SHORTCUTS)
+
+if _find_spec('numpy') is None:
+    _warnings.warn('Only `cma.purecma` can be imported. Install `numpy` ("pip'
           ' install numpy") if you want to import the entire `cma`'
           ' package.')
-else:
-    from . import (constraints_handler, evolution_strategy, fitness_functions,
-                    fitness_transformations, interfaces, optimization_tools,
-                    sampler, sigma_adaptation, transformations, utilities,
-                    )
-    # from . import test  # gives a warning with python -m cma.test (since Python 3.5.3?)
-    test = 'type "import cma.test" to access the `test` module of `cma`'
-    from . import s
-    from .fitness_functions import ff
-    from .fitness_transformations import GlueArguments, ScaleCoordinates
-    from .evolution_strategy import fmin, fmin2, fmin_con, CMAEvolutionStrategy, CMAOptions
-    from .logger import disp, plot, CMADataLogger
-    from .optimization_tools import NoiseHandler
-    from .constraints_handler import BoundPenalty, BoundTransform
-    from .evolution_strategy import cma_default_options_
+    __all__ = ['purecma']
+
+def __getattr__(name):
+    if name in _SHORTCUTS:
+        value = getattr(_import_module('.' + _SHORTCUTS[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = _import_module('.' + name, __name__)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_SUBMODULES) | set(_SHORTCUTS))
+
+if _sys.version_info < (3, 7):  # no module __getattr__, import everything
+    for _name in _SUBMODULES + tuple(_SHORTCUTS):
+        if _name != 'purecma' and _find_spec('numpy') is None:
+            continue
+        __getattr__(_name)
 
 del division, print_function, absolute_import, with_statement  #, unicode_literals
 
@@ -31,7 +31,7 @@ if sys.version[0] == '2':  # in python 2
         except ImportError:
             pass
 else:
-    try:
-        abc = _collections.abc
-    except AttributeError:
+    try:  # the attribute only exists once collections.abc was imported
+        import collections.abc as abc
+    except ImportError:
         abc = _collections
@@ -0,0 +1,13 @@
+extern unsigned char __VERIFIER_nondet_uchar();
+
+int main() {
+    unsigned char x = __VERIFIER_nondet_uchar();
+    if (x > 100) {
+        // unreachable, all 256 inputs end up in the evaluation cache and no program runs anymore
+        if (x == 7) {
+            return 1;
+        }
+        return 2;
+    }
+    return 0;
+}
@@ -8,70 +8,299 @@ import random
 import argparse
 import datetime
 import csv
-
-_init_time = time.time()
-_time_log = {}
-
-def _timeit(f):
+import select
+import signal
+import tempfile
+import mmap
+import copy
+import queue
+import concurrent.futures
+import multiprocessing
+import collections
+import hashlib
+import shutil
+import json
+import resource
+import threading
+import atexit
+import struct
+import re
+import warnings
+import pickle
+import io
+import math
+import zlib
+
+
+class Profiler:
+    # the calls and total time of each decorated method are always counted. when enabled, every call is also
+    # counted in a histogram for percentiles, cpu time of the fuzzer and of its waited child processes, and the
+    # chrome trace events are streamed to the trace file
+    PERCENTILES = [50, 95, 99]
+    # log scaled histogram buckets, the percentiles are within 3% of the exact ones
+    BUCKETS_PER_DECADE = 40
+
+    def __init__(self):
+        self.enabled = False
+        self.total_time = {}
+        self.calls = collections.Counter()
+        self.histograms = collections.defaultdict(collections.Counter)
+        self.cpu_time = collections.Counter()
+        self.children_cpu_time = collections.Counter()
+        self.first_evaluation = None
+        self._trace = None
+        self._start = time.perf_counter()
+        # the worker threads of the parallel evaluation update the counts concurrently
+        self._lock = threading.Lock()
+
+    def reset(self):
+        # the dictionaries are cleared in place, _time_log refers to total_time
+        with self._lock:
+            self.total_time.clear()
+            self.calls.clear()
+            self.histograms.clear()
+            self.cpu_time.clear()
+            self.children_cpu_time.clear()
+            self.first_evaluation = None
+            self._start = time.perf_counter()
+
+    def enable(self, trace_file = None):
+        self.enabled = True
+        if trace_file is not None:
+            self.close_trace()
+            self._trace = open(trace_file, 'w')
+            self._trace.write('{"displayTimeUnit": "ms", "traceEvents": [')
+            self._trace_separator = '\n'
+
+    def close_trace(self):
+        # chrome trace event format, viewable in chrome://tracing or perfetto
+        with self._lock:
+            if self._trace is not None:
+                self._trace.write('\n]}\n')
+                self._trace.close()
+                self._trace = None
+
+    def record_first_evaluation(self, seconds):
+        with self._lock:
+            if self.first_evaluation is None:
+                self.first_evaluation = seconds
+
+    def timeit(self, f):
+        name = f.__name__
         def newf(*args, **kwargs):
+            if self.enabled:
+                return self._profile(name, f, args, kwargs)
+
             startTime = time.time()
             output = f(*args, **kwargs)
             elapsedTime = time.time() - startTime
 
-            if not f.__name__ in _time_log:
-                _time_log[f.__name__] = 0.
-            _time_log[f.__name__] += elapsedTime
-
+            self._add(name, elapsedTime)
             return output
         return newf
 
+    def _add(self, name, elapsed):
+        with self._lock:
+            self._add_locked(name, elapsed)
+
+    def _add_locked(self, name, elapsed):
+        if not name in self.total_time:
+            self.total_time[name] = 0.
+        self.total_time[name] += elapsed
+        self.calls[name] += 1
+
+    @staticmethod
+    def _children_cpu_time():
+        # child processes only count once they are waited for, the children of a fork server are waited by the server
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def _bucket(self, elapsed):
+        return math.floor(math.log10(max(elapsed, 1e-9)) * self.BUCKETS_PER_DECADE)
+
+    def _percentiles(self, histogram):
+        # the geometric center of the bucket that holds each percentile
+        total = sum(histogram.values())
+        buckets = sorted(histogram.items())
+        percentiles = []
+        for p in self.PERCENTILES:
+            rank, count = p / 100 * total, 0
+            for bucket, n in buckets:
+                count += n
+                if count >= rank:
+                    break
+            percentiles.append(10 ** ((bucket + 0.5) / self.BUCKETS_PER_DECADE))
+        return percentiles
+
+    def _profile(self, name, f, args, kwargs):
+        start_cpu = time.process_time()
+        start_children_cpu = self._children_cpu_time()
+        start = time.perf_counter()
+        output = f(*args, **kwargs)
+        end = time.perf_counter()
+        cpu_time = time.process_time() - start_cpu
+        children_cpu_time = self._children_cpu_time() - start_children_cpu
+
+        with self._lock:
+            self._add_locked(name, end - start)
+            self.histograms[name][self._bucket(end - start)] += 1
+            self.cpu_time[name] += cpu_time
+            self.children_cpu_time[name] += children_cpu_time
+            if self._trace is not None:
+                self._trace.write(self._trace_separator + json.dumps(dict(name = name, ph = 'X', ts = round((start - self._start) * 1e6, 1), dur = round((end - start) * 1e6, 1), pid = os.getpid(), tid = threading.get_ident())))
+                self._trace_separator = ',\n'
+        return output
+
+    def times(self):
+        # a copy of the total times that the worker threads cannot change while it is read
+        with self._lock:
+            return dict(self.total_time)
+
+    def stats(self):
+        # times in seconds, percentiles of a single call in milliseconds
+        rows = [['method', 'calls', 'total_time', 'cpu_time', 'children_cpu_time'] + ['p%d_ms' % p for p in self.PERCENTILES]]
+        for name, total in sorted(self.times().items(), key=lambda item: item[1]):
+            with self._lock:
+                histogram = dict(self.histograms.get(name, {}))
+            if histogram:
+                percentiles = [round(1000 * p, 3) for p in self._percentiles(histogram)]
+            else:
+                percentiles = [''] * len(self.PERCENTILES)
+            rows.append([name, self.calls[name], round(total, 4), round(self.cpu_time[name], 4), round(self.children_cpu_time[name], 4)] + percentiles)
+        return rows
+
+_profiler = Profiler()
+_time_log = _profiler.total_time
+_timeit = _profiler.timeit
+
+
+class LogWriter:
+    # writes to the log files on a background thread, the files stay open and are flushed periodically
+    QUEUE_SIZE = 1024
+    FLUSH_INTERVAL = 1
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._files = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, f):
+        self._files.append(f)
+        return f
+
+    def write(self, write, *args):
+        self._queue.put((write, args))
+
+    def _write_loop(self):
+        last_flush = time.time()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.FLUSH_INTERVAL)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                write, args = item
+                if write is None:
+                    self._queue.task_done()
+                    break
+                try:
+                    write(*args)
+                finally:
+                    self._queue.task_done()
+            if time.time() - last_flush >= self.FLUSH_INTERVAL:
+                self._flush()
+                last_flush = time.time()
+
+    def _flush(self):
+        for f in self._files:
+            if not f.closed:
+                f.flush()
+
+    def sync(self):
+        # wait until everything queued so far is written and flushed
+        if self._closed:
+            return
+        self.write(self._flush)
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self.sync()
+        self._closed = True
+        self._queue.put((None, ()))
+        self._thread.join()
+        for f in self._files:
+            f.close()
+        atexit.unregister(self.close)
+
 
 class FuzzerLogger:
     N_INITIAL = 18
 
     def __init__(self, strategy, live):
         self._fuzzer = None
-        self._log = dict(fuzzer_state = '', optimized = False, popsize = 0, current_testcase = 0, total_testcase = 0, generations = 0, current_coverage = 0, total_coverage = 0, evaluations = 0 ,time = 0, CMA_ES_seed = None)
-        self._log_message_lines = []
+        self._log = dict(fuzzer_state = '', optimized = False, popsize = 0, current_testcase = 0, total_testcase = 0, generations = 0, current_coverage = 0, total_coverage = 0, evaluations = 0 ,time = 0, CMA_ES_seed = None, cache_hits = 0, cache_misses = 0)
         self._strategy_name = str(strategy)
-        self._csv_lines = [['strategy', self._strategy_name]]
         self._live = live
+        # the messages are spooled to a file until print_logs and the csv rows are written as they come
+        self._writer = LogWriter()
+        self._messages = self._writer.add(tempfile.TemporaryFile('w+'))
+        self._csv = None
+        self._live_file = None
 
     def format_pretty(self, info, n):
         return "{: <{n}}".format(str(info), n=n)
 
-    def resister(self, fuzzer):
+    def _message(self, line):
+        self._writer.write(self._messages.write, line + '\n')
+
+    def _live_write(self, text):
+        if self._live:
+            self._writer.write(self._live_file.write, text)
+
+    def _csv_row(self, row):
+        self._writer.write(self._csv.writerow, row)
+
+    def resister(self, fuzzer, resume = False):
+        # a resumed campaign appends to the logs of the run it continues
         self._fuzzer = fuzzer
         self._log_path = fuzzer._program.log_dir
         self._filename = self._log_path + fuzzer._program.pname +'.txt'
         self._csvname = self._log_path + fuzzer._program.pname + '_' + self._strategy_name +'.csv'
-        
-        initial_parameter_keys = ['no_reset', 'hot_restart', 'save_interesting', 'sample_type', 'coverage_type', 'input_size', 'max_popsize', 'popsize_scale', 'max_gens', 'max_eval', 'timeout', 'seed', 'strategy']
-        initial_parameter_values = [fuzzer.no_reset, fuzzer.hot_restart, fuzzer.save_interesting, fuzzer.sample_type, fuzzer._program.coverage_type, fuzzer.cma_es.input_size, fuzzer.cma_es._max_popsize, fuzzer.cma_es._popsize_scale, fuzzer.cma_es._max_gens, fuzzer.cma_es.max_evaluations, fuzzer._timeout, fuzzer.seed, self._strategy_name]
-
-        self._csv_lines.append(list(self._log.keys()))
-
-        self._log_message_lines.append('\nfuzzer args:\n' + ' '.join(sys.argv))
-        self._log_message_lines.append('program_path: ' + fuzzer._program.path)
-        self._log_message_lines.append('initial parameters:')
-        self._log_message_lines.append(''.join([self.format_pretty(key, len(key) + 2) for key in initial_parameter_keys]))
-        self._log_message_lines.append(''.join([self.format_pretty(value, len(initial_parameter_keys[i]) + 2) for i, value in enumerate(initial_parameter_values)]))
-        self._log_message_lines.append('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
-        self._log_message_lines.append('logs:')
-        self._log_message_lines.append(''.join([self.format_pretty(key, len(key) + 3) for key in self._log]))
-
+        self._csv = csv.writer(self._writer.add(open(self._csvname, 'a' if resume else 'w', newline='')))
         if self._live:
-            with open(self._filename, 'w') as f:
-                f.write('fuzzer args:\n' + ' '.join(sys.argv) + '\n')
-                f.write('program_path: ' + fuzzer._program.path + '\n')
-                f.write('initial parameters:\n')
-                f.writelines(self.format_pretty(key, len(key) + 2) for key in initial_parameter_keys)
-                f.write('\n')
-                f.writelines(self.format_pretty(value, len(initial_parameter_keys[i]) + 2) for i, value in enumerate(initial_parameter_values))
-                f.write('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------\n')
-                f.write('logs:\n')
-                f.writelines(self.format_pretty(key, len(key) + 3) for key in self._log)
-                f.write('\n')
+            self._live_file = self._writer.add(open(self._filename, 'a' if resume else 'w'))
+        
+        initial_parameter_keys = ['no_reset', 'hot_restart', 'save_interesting', 'sample_type', 'coverage_type', 'execution_engine', 'input_size', 'max_popsize', 'popsize_scale', 'max_gens', 'max_eval', 'timeout', 'seed', 'strategy']
+        initial_parameter_values = [fuzzer.no_reset, fuzzer.hot_restart, fuzzer.save_interesting, fuzzer.sample_type, fuzzer._program.coverage_type, fuzzer._program.execution_engine, fuzzer.cma_es.input_size, fuzzer.cma_es._max_popsize, fuzzer.cma_es._popsize_scale, fuzzer.cma_es._max_gens, fuzzer.cma_es.max_evaluations, fuzzer._timeout, fuzzer.seed, self._strategy_name]
+
+        if not resume:
+            self._csv_row(['strategy', self._strategy_name])
+            self._csv_row(list(self._log.keys()))
+
+        self._message('\nfuzzer args:\n' + ' '.join(sys.argv))
+        self._message('program_path: ' + fuzzer._program.path)
+        self._message('initial parameters:')
+        self._message(''.join([self.format_pretty(key, len(key) + 2) for key in initial_parameter_keys]))
+        self._message(''.join([self.format_pretty(value, len(initial_parameter_keys[i]) + 2) for i, value in enumerate(initial_parameter_values)]))
+        self._message('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
+        self._message('logs:')
+        self._message(''.join([self.format_pretty(key, len(key) + 3) for key in self._log]))
+
+        self._live_write('fuzzer args:\n' + ' '.join(sys.argv) + '\n'
+            + 'program_path: ' + fuzzer._program.path + '\n'
+            + 'initial parameters:\n'
+            + ''.join(self.format_pretty(key, len(key) + 2) for key in initial_parameter_keys)
+            + '\n'
+            + ''.join(self.format_pretty(value, len(initial_parameter_keys[i]) + 2) for i, value in enumerate(initial_parameter_values))
+            + '\n-----------------------------------------------------------------------------------------------------------------------------------------------------------\n'
+            + 'logs:\n'
+            + ''.join(self.format_pretty(key, len(key) + 3) for key in self._log)
+            + '\n')
 
         return self
 
@@ -84,59 +313,496 @@ class FuzzerLogger:
         self._log.update(self._fuzzer.get_current_state())
         self._log['time'] = round(self._fuzzer.time(), 2)
 
-        self._csv_lines.append(list(self._log.values()))
-
-        self._log_message_lines.append(''.join([self.format_pretty(value, len(key) + 3) for key, value in self._log.items()]))
+        self._csv_row(list(self._log.values()))
 
-        if self._live:
-            with open(self._filename, 'a') as f:
-                f.writelines(self.format_pretty(value, len(key) + 3) for key, value in self._log.items())
-                f.write('\n')
+        line = ''.join([self.format_pretty(value, len(key) + 3) for key, value in self._log.items()])
+        self._message(line)
+        self._live_write(line + '\n')
     
     def report_final(self):
         final_report = [self._fuzzer._samplecollector.get_total_size(), round(self._fuzzer.get_total_coverage(),Program.COV_DIGITS), self._fuzzer._stop_reason, self._fuzzer._statuses]
 
-        self._log_message_lines.append('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
-        self._log_message_lines.append('final report:')
-        self._log_message_lines.append('total_testcase        total_coverage        stop_reason        testcase_statuses')
-        self._log_message_lines.append(''.join(['      %s         ' % str(total) for total in final_report]))
+        self._message('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
+        self._message('final report:')
+        self._message('total_testcase        total_coverage        stop_reason        testcase_statuses')
+        self._message(''.join(['      %s         ' % str(total) for total in final_report]))
 
-        if self._live:
-            with open(self._filename, 'a') as f:
-                f.write('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------\n')
-                f.write('final report:\n')
-                f.write('total_testcase        total_coverage        stop_reason        testcase_statuses\n')
-                f.writelines('      %s         ' % str(total) for total in final_report)
+        self._live_write('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------\n'
+            + 'final report:\n'
+            + 'total_testcase        total_coverage        stop_reason        testcase_statuses\n'
+            + ''.join('      %s         ' % str(total) for total in final_report))
 
     def report_time_log(self):
-        time_log = {k: v for k, v in sorted(_time_log.items(), key=lambda item: item[1])}
-
-        self._log_message_lines.append('execution time for each method:')
-        self._log_message_lines.append(''.join([self.format_pretty(key, max(len(key),6) + 2) for key, value in time_log.items()]))
-        self._log_message_lines.append(''.join([self.format_pretty(round(value,2), max(len(key),6) + 2) for key, value in time_log.items()]))
-        self._log_message_lines.append('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
-
-        if self._live:
-            with open(self._filename, 'a') as f:
-                f.write('execution time for each method:\n')
-                f.writelines(self.format_pretty(key, max(len(key), 6) + 2) for key, value in time_log.items())
-                f.write('\n')
-                f.writelines(self.format_pretty(round(value,2), max(len(key), 6) + 2) for key, value in time_log.items())
-                f.write('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------\n')
+        time_log = {k: v for k, v in sorted(_profiler.times().items(), key=lambda item: item[1])}
+
+        self._message('execution time for each method:')
+        self._message(''.join([self.format_pretty(key, max(len(key),6) + 2) for key, value in time_log.items()]))
+        self._message(''.join([self.format_pretty(round(value,2), max(len(key),6) + 2) for key, value in time_log.items()]))
+        if _profiler.first_evaluation is not None:
+            self._message('time to first evaluation: %s' % round(_profiler.first_evaluation, 2))
+        self._message('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
+
+        if _profiler.enabled:
+            stats = _profiler.stats()
+            self._csv_row([])
+            for row in stats:
+                self._csv_row(row)
+            self._message('profile for each method:')
+            for row in stats:
+                self._message(''.join(self.format_pretty(value, 32 if i == 0 else 20) for i, value in enumerate(row)))
+            self._message('\n-----------------------------------------------------------------------------------------------------------------------------------------------------------')
+
+        self._live_write('execution time for each method:\n'
+            + ''.join(self.format_pretty(key, max(len(key), 6) + 2) for key, value in time_log.items())
+            + '\n'
+            + ''.join(self.format_pretty(round(value,2), max(len(key), 6) + 2) for key, value in time_log.items())
+            + '\n-----------------------------------------------------------------------------------------------------------------------------------------------------------\n')
+
+    def _read_messages(self):
+        self._writer.sync()
+        self._messages.seek(0)
+        messages = self._messages.read()
+        self._messages.seek(0, os.SEEK_END)
+        return messages
 
     def write_logs(self):
         with open(self._filename, 'w') as f:
-            f.writelines('%s\n' % message for message in self._log_message_lines)
+            f.write(self._read_messages())
 
     def write_csv(self):
-        with open(self._csvname, 'w+', newline='') as f:
-           csv.writer(f).writerows(self._csv_lines) 
+        self._writer.sync()
 
     def print_logs(self):
-        print(*self._log_message_lines, sep='\n')
+        sys.stdout.write(self._read_messages())
+
+    def close(self):
+        self._writer.close()
+
+class ForkServer:
+    # the harness in __VERIFIER.c stops before main and forks a child for each request
+    ENV = '__VERIFIER_FORKSERVER'
+    INIT_TIMEOUT = 5
+    REQUEST = bytes(4)
+
+    def __init__(self, path, env = None):
+        self.path = path
+        self._input = tempfile.TemporaryFile()
+        self._output = tempfile.TemporaryFile()
+        control_read, self._control = os.pipe()
+        self._status, status_write = os.pipe()
+        env = dict(os.environ if env is None else env)
+        env[self.ENV] = '%d,%d' % (control_read, status_write)
+        self._process = subprocess.Popen(path, stdin=self._input, stdout=self._output, stderr=subprocess.DEVNULL, env=env, pass_fds=(control_read, status_write))
+        os.close(control_read)
+        os.close(status_write)
+        try:
+            self.alive = self._read_int(self.INIT_TIMEOUT) is not None
+        except ChildProcessError:
+            self.alive = False
+        if not self.alive:
+            self.close()
+
+    def _read_int(self, timeout):
+        if not select.select([self._status], [], [], max(timeout, 0))[0]:
+            return None
+        data = os.read(self._status, 4)
+        if len(data) != 4:
+            raise ChildProcessError('%s exited' % self.path)
+        return int.from_bytes(data, sys.byteorder, signed=True)
+
+    def _write_input(self, input_bytes):
+        self._input.seek(0)
+        self._input.truncate()
+        if input_bytes is not None:
+            self._input.write(input_bytes)
+        self._input.flush()
+        self._input.seek(0)
+        self._output.seek(0)
+        self._output.truncate()
+
+    def run(self, input_bytes, timeout):
+        try:
+            self._write_input(input_bytes)
+            os.write(self._control, self.REQUEST)
+            pid = self._read_int(self.INIT_TIMEOUT)
+            if pid is None:
+                raise ChildProcessError('fork server of %s is not responding' % self.path)
+
+            status = self._read_int(timeout)
+            if status is None:
+                os.kill(pid, signal.SIGKILL)
+                try:
+                    self._read_int(self.INIT_TIMEOUT)
+                except ChildProcessError:
+                    pass
+                raise subprocess.TimeoutExpired(self.path, timeout)
+        except BaseException:
+            self.close()
+            raise
+
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+
+        self._output.seek(0)
+        return returncode, self._output.read()
+
+    def close(self):
+        if self._process is None:
+            return
+        self.alive = False
+        os.close(self._control)
+        os.close(self._status)
+        try:
+            self._process.wait(timeout=self.INIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+        self._input.close()
+        self._output.close()
+
+class PersistentServer(ForkServer):
+    # the harness in __VERIFIER.c calls main in a loop in the same process, the pid it reports is its own
+    ENV = '__VERIFIER_PERSISTENT'
+
+class CoverageMap:
+    # shared memory into which the harness writes the arc counters of the program in the format of a .gcda file.
+    # the map of CMP_ENV has a uint64 for each offset, the complement of the smallest distance of the operands of a comparison
+    ENV = '__VERIFIER_COVERAGE_MAP'
+    CMP_ENV = '__VERIFIER_CMP_MAP'
+    SHM_DIR = '/dev/shm'
+
+    def __init__(self, size, dtype = np.uint8):
+        nbytes = size * np.dtype(dtype).itemsize
+        self._file = tempfile.NamedTemporaryFile(dir=self.SHM_DIR if os.path.isdir(self.SHM_DIR) else None)
+        self._file.truncate(nbytes)
+        self._mmap = mmap.mmap(self._file.fileno(), nbytes)
+        self.bitmap = np.frombuffer(self._mmap, dtype=dtype)
+        self.env = '%s,%d' % (self._file.name, nbytes)
+
+    def reset(self):
+        self.bitmap.fill(0)
+
+    def close(self):
+        del self.bitmap
+        self._mmap.close()
+        self._file.close()
+
+class GcovReader:
+    # reads the coverage of a run from the .gcno and .gcda files that --coverage writes, without running gcov.
+    # the ids are the indices of the lines in gcov's text output like those of Program.cal_lines and Program.cal_branches,
+    # the functions, blocks and arcs of the .gcno file are matched once against gcov's output for the program
+    GCNO_MAGIC = 0x67636e6f
+    GCDA_MAGIC = 0x67636461
+    TAG_FUNCTION = 0x01000000
+    TAG_BLOCKS = 0x01410000
+    TAG_ARCS = 0x01430000
+    TAG_LINES = 0x01450000
+    TAG_ARC_COUNTS = 0x01a10000
+    ARC_ON_TREE = 1
+    ARC_FAKE = 2
+
+    def __init__(self, gcno_path, line_gcov, branch_gcov):
+        with open(gcno_path, 'rb') as f:
+            functions = self._read_gcno(f.read())
+
+        self._counter_offsets = {}
+        lines = {}
+        counter_size = 0
+        for ident, block_size, arcs, locations in functions:
+            blocks, arc_counts, counters = self._solve(block_size, arcs, counter_size)
+            self._counter_offsets[ident] = (counter_size, counters)
+            counter_size += counters
+            self._add_lines(lines, block_size, arcs, locations, blocks, arc_counts)
+        self._counter_size = counter_size
+        # size of the .gcda data: the header, a function and an arc counts record for each function and the end
+        self.gcda_size = 16 + 28 * len(functions) + 8 * counter_size + 4
+
+        line_entries = self._gcov_entries(line_gcov)
+        branch_entries = self._gcov_entries(branch_gcov)
+        if set(line_entries) != set(lines) or set(branch_entries) != set(lines):
+            raise ValueError('the lines of the .gcno file do not match gcov')
+
+        line_rows, report_line_rows, branch_rows = [], [], []
+        for line, (count, branches) in lines.items():
+            line_rows.append((line_entries[line][0], count))
+            report_line_rows.append((branch_entries[line][0], count))
+            gcov_branches = branch_entries[line][1]
+            if [kind for kind, _ in branches] != [kind for _, kind in gcov_branches]:
+                raise ValueError('the branches of the .gcno file do not match gcov')
+            branch_rows += [(index, arc_count) for (kind, arc_count), (index, _) in zip(branches, gcov_branches) if kind == 'b']
+        self._lines = self._matrix(line_rows)
+        self._report_lines = self._matrix(report_line_rows)
+        self._branches = self._matrix(branch_rows)
+
+    @staticmethod
+    def _gcc_major(version):
+        # the version is stored as 4 characters, e.g. 'B22*' for gcc 12.2
+        chars = version.to_bytes(4, 'big').decode('ascii', 'replace')
+        return (ord(chars[0]) - ord('A')) * 10 + int(chars[1])
+
+    def _header(self, data, magic):
+        if len(data) < 12 or struct.unpack_from('<I', data)[0] != magic:
+            raise ValueError('not a gcov file')
+        major = self._gcc_major(struct.unpack_from('<I', data, 4)[0])
+        # since gcc 12 lengths are counted in bytes instead of 4 byte words and the header has a checksum
+        if major >= 12:
+            return 1, 16
+        return 4, 12
+
+    @staticmethod
+    def _records(data, pos, unit):
+        while pos + 8 <= len(data):
+            tag, length = struct.unpack_from('<Ii', data, pos)
+            pos += 8
+            if tag == 0:
+                return
+            # a negative length marks counters that are all zero and are left out
+            size = max(length, 0) * unit
+            yield tag, pos, length * unit
+            pos += size
+
+    @staticmethod
+    def _string(data, pos, unit):
+        length = struct.unpack_from('<I', data, pos)[0] * unit
+        pos += 4
+        return data[pos:pos + length].split(b'\0', 1)[0].decode(), pos + length
+
+    def _read_gcno(self, data):
+        unit, pos = self._header(data, self.GCNO_MAGIC)
+        _, pos = self._string(data, pos, unit)
+        pos += 4
+
+        functions = []
+        for tag, start, length in self._records(data, pos, unit):
+            if tag == self.TAG_FUNCTION:
+                function = [struct.unpack_from('<I', data, start)[0], 0, [], []]
+                functions.append(function)
+            elif tag == self.TAG_BLOCKS:
+                function[1] = struct.unpack_from('<I', data, start)[0]
+            elif tag == self.TAG_ARCS:
+                values = struct.unpack_from('<%dI' % (length // 4), data, start)
+                function[2] += [(values[0], values[i], values[i + 1]) for i in range(1, len(values) - 1, 2)]
+            elif tag == self.TAG_LINES:
+                block = struct.unpack_from('<I', data, start)[0]
+                pos = start + 4
+                while pos < start + length:
+                    lineno = struct.unpack_from('<I', data, pos)[0]
+                    pos += 4
+                    if lineno != 0:
+                        function[3][-1][2].append(lineno)
+                        continue
+                    name, pos = self._string(data, pos, unit)
+                    if not name:
+                        break
+                    function[3].append((block, name, []))
+        return functions
+
+    @staticmethod
+    def _add(*vectors, sign = 1):
+        total = collections.Counter()
+        for i, vector in enumerate(vectors):
+            for counter, coefficient in vector.items():
+                total[counter] += coefficient if i == 0 else sign * coefficient
+        return {counter : coefficient for counter, coefficient in total.items() if coefficient != 0}
+
+    def _solve(self, block_size, arcs, counter_offset):
+        # the counts of the arcs on the spanning tree follow from the counted arcs, as in gcov's solve_flow_graph.
+        # each count is kept as a sum of counters, so a run only needs one matrix product
+        arc_counts = [None] * len(arcs)
+        counters = 0
+        predecessors = [[] for _ in range(block_size)]
+        successors = [[] for _ in range(block_size)]
+        for i, (src, dest, flags) in enumerate(arcs):
+            if not flags & self.ARC_ON_TREE:
+                arc_counts[i] = {counter_offset + counters : 1}
+                counters += 1
+            successors[src].append(i)
+            predecessors[dest].append(i)
+
+        blocks = [None] * block_size
+        changed = True
+        while changed:
+            changed = False
+            for block in range(block_size):
+                if blocks[block] is None:
+                    for group in (predecessors[block], successors[block]):
+                        if group and all(arc_counts[i] is not None for i in group):
+                            blocks[block] = self._add({}, *[arc_counts[i] for i in group])
+                            changed = True
+                            break
+                if blocks[block] is None:
+                    continue
+                for group in (predecessors[block], successors[block]):
+                    unknown = [i for i in group if arc_counts[i] is None]
+                    if len(unknown) == 1:
+                        arc_counts[unknown[0]] = self._add(blocks[block], *[arc_counts[i] for i in group if i != unknown[0]], sign = -1)
+                        changed = True
+        return [{} if count is None else count for count in blocks], [{} if count is None else count for count in arc_counts], counters
+
+    def _add_lines(self, lines, block_size, arcs, locations, blocks, arc_counts):
+        # like gcov's add_line_counts: the blocks and branches of a block belong to the last line of each of its locations
+        block_locations = [[] for _ in range(block_size)]
+        for block, name, numbers in locations:
+            block_locations[block].append((name, numbers))
+        successors = [[] for _ in range(block_size)]
+        for i, (src, dest, flags) in enumerate(arcs):
+            successors[src].append(i)
+        # gcov sorts the successors of a block by their destination
+        successors = [sorted(arc_ids, key=lambda i: arcs[i][1]) for arc_ids in successors]
+
+        last_blocks = {}
+        for block in range(block_size):
+            non_fake = [i for i in successors[block] if not arcs[i][2] & self.ARC_FAKE]
+            line = None
+            for name, numbers in block_locations[block]:
+                for number in numbers:
+                    line = (name, number)
+                    lines.setdefault(line, [{}, []])
+                    if line not in last_blocks:
+                        lines[line][0] = self._add(lines[line][0], blocks[block])
+                if block == 0 or block == block_size - 1 or line is None:
+                    continue
+                if line not in last_blocks:
+                    last_blocks[line] = {}
+                last_blocks[line] = self._add(last_blocks[line], blocks[block])
+                lines[line][0] = last_blocks[line]
+                for i in successors[block]:
+                    if arcs[i][2] & self.ARC_FAKE and arcs[i][0] != 0:
+                        lines[line][1].append(('c', arc_counts[i]))
+                    elif len(non_fake) != 1:
+                        lines[line][1].append(('b', arc_counts[i]))
+
+    @staticmethod
+    def _gcov_entries(gcov):
+        # (source, line number) -> index of the line in gcov's output and the branch and call lines that follow it
+        entries = {}
+        source = None
+        for i, line in enumerate(gcov.split('\n')):
+            if line == '':
+                break
+            if line[0] == ' ':
+                count, number, text = line.split(':', 2)
+                if int(number) == 0:
+                    if text.startswith('Source:'):
+                        source = text[len('Source:'):]
+                    continue
+                entry = [i, []]
+                if count.strip() != '-':
+                    entries[(source, int(number))] = entry
+            elif line.startswith('branch') or line.startswith('call'):
+                entry[1].append((i, line[0]))
+        return entries
+
+    @staticmethod
+    def _matrix(rows):
+        indices = np.array([index for index, _ in rows], dtype=np.int64)
+        row_ids = [row for row, (_, vector) in enumerate(rows) for _ in vector]
+        counters = [counter for _, vector in rows for counter in vector]
+        coefficients = [coefficient for _, vector in rows for coefficient in vector.values()]
+        return indices, np.array(row_ids, dtype=np.int64), np.array(counters, dtype=np.int64), np.array(coefficients, dtype=np.float64)
+
+    def read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = bytes(4)
+        return self.parse(data)
+
+    def parse(self, data):
+        # the counters of the data of a .gcda file, or of a CoverageMap into which the harness wrote it
+        counters = np.zeros(self._counter_size)
+        if struct.unpack_from('<I', data)[0] == 0:
+            # the run crashed before the counters were written
+            return counters
+        unit, pos = self._header(data, self.GCDA_MAGIC)
+        offset = None
+        for tag, start, length in self._records(data, pos, unit):
+            if tag == self.TAG_FUNCTION:
+                offset = self._counter_offsets.get(struct.unpack_from('<I', data, start)[0]) if length > 0 else None
+            elif tag == self.TAG_ARC_COUNTS and offset is not None and length > 0:
+                begin, size = offset
+                size = min(size, length // 8)
+                counters[begin:begin + size] = np.frombuffer(data, dtype='<u8', count=size, offset=start)
+        return counters
+
+    @staticmethod
+    def _counts(matrix, counters):
+        indices, row_ids, columns, coefficients = matrix
+        return np.bincount(row_ids, weights=coefficients * counters[columns], minlength=len(indices))
+
+    @classmethod
+    def _ids(cls, matrix, counters):
+        counts = cls._counts(matrix, counters)
+        return CoverageItemIds.from_ids(matrix[0][counts > 0].tolist())
+
+    def line_ids(self, counters, report = False):
+        # report ids are indices in the output of gcov -b -c -t, like those of Program.get_report_ids
+        return self._ids(self._report_lines if report else self._lines, counters)
+
+    def branch_ids(self, counters):
+        return self._ids(self._branches, counters)
+
+    def counts(self, counters, line = False):
+        # ids and execution counts of the lines or branches, like those of Program.cal_counts
+        matrix = self._lines if line else self._branches
+        return matrix[0], self._counts(matrix, counters)
+
+class BuildCache:
+    # compiled programs stored by a hash of their sources, flags and the gcc version.
+    # a build is made in a temporary directory that is renamed into place, so other processes only see complete builds
+    _gcc_version = None
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = os.path.realpath(cache_dir) + '/'
+
+    @classmethod
+    def gcc_version(cls):
+        if cls._gcc_version is None:
+            cls._gcc_version = subprocess.run(['gcc', '--version'], capture_output=True).stdout
+        return cls._gcc_version
+
+    def key(self, kind, sources, flags):
+        # the source paths are recorded in the .gcno files and printed by gcov, a relative one is also resolved from the working directory
+        key = hashlib.sha256(self.gcc_version())
+        key.update(repr((kind, [(source, os.path.abspath(source)) for source in sources], flags)).encode())
+        for source in sources:
+            with open(source, 'rb') as f:
+                key.update(f.read())
+        return key.hexdigest()
+
+    def get(self, kind, sources, flags, build):
+        entry = self.cache_dir + self.key(kind, sources, flags) + '/'
+        if os.path.isdir(entry):
+            return entry, Program.SAFE
+
+        build_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.build_') + '/'
+        try:
+            returncode = build(build_dir)
+            if returncode == Program.SAFE:
+                try:
+                    os.rename(build_dir, entry)
+                except OSError:
+                    # another process has stored the same build in the meantime
+                    pass
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return entry, returncode
 
 class Program:
-    DEFAULTS = {'coverage_type' : 'branch'}
+    DEFAULTS = {'coverage_type' : 'branch', 'execution_engine' : 'subprocess', 'final_coverage' : 'rerun', 'objective' : 'coverage'}
+    EXECUTION_ENGINES = {'subprocess' : None, 'fork_server' : ForkServer, 'persistent' : PersistentServer}
+    FINAL_COVERAGES = ['rerun', 'accumulated', 'checked']
+    # hit_count breaks ties of the covered items by new hit count buckets, cmp_distance first by the distances of the comparisons
+    OBJECTIVES = ['coverage', 'hit_count', 'cmp_distance']
+    # line and branch coverage read from the .gcda files by GcovReader instead of gcov
+    NATIVE_COVERAGE_TYPES = {'native_line' : 'line', 'native_branch' : 'branch'}
+    # the same from the counters that the harness writes into a CoverageMap instead of .gcda files
+    MAP_COVERAGE_TYPES = {'map_line' : 'line', 'map_branch' : 'branch'}
 
     # return codes
     SAFE = 0
@@ -151,32 +817,104 @@ class Program:
     MIN_INPUT_SIZE = 2
     MAX_INPUT_SIZE = 1000
 
+    # comments and literals are skipped, then calls of __VERIFIER_nondet_*, tokens that gcc compiles to branches
+    # and preprocessor directives are counted
+    SOURCE_TOKENS = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|^[ \t]*#[ \t]*(include[ \t]*"|[a-z]+)|##'
+        r'|\b(__VERIFIER_nondet_\w+)\b|\b(if|for|while|switch|case)\b|(&&|\|\||\?)', re.DOTALL | re.MULTILINE)
+
     COV_DIGITS = 2
     INPUT_TIMEOUT = 5
     RUN_TIMEOUT = 5
+    # the first persistent runs and then every interval-th are compared with a run in a fresh process
+    PERSISTENT_CHECKS = 10
+    PERSISTENT_CHECK_INTERVAL = 100
 
-    DEFAULT_DIRS = {'log' : 'logs/', 'output' : 'output/', 'verifiers': 'verifiers/'}
-    def __init__(self, path, output_dir, log_dir, timeout, sample_type, coverage_type, seed, input_size, verifier_path = '/__VERIFIER.c', verifier_input_size_path = '/__VERIFIER_input_size.c', verifier_xml_dump_path = '/__VERIFIER_xml_dump.c'):
+    # the first native runs are compared with gcov
+    NATIVE_CHECKS = 10
+
+    # upper ends of the hit count buckets of AFL: 1, 2, 3, 4-7, 8-15, 16-31, 32-127 and 128 or more executions
+    HIT_BUCKETS = np.array([1, 2, 3, 7, 15, 31, 127])
+    # closeness of a comparison of equal operands, it is less by the log2 of the distance of the operands + 1
+    CMP_CLOSENESS = 64
+
+    # type codes the harness prints for its nondet calls: type name, size in bytes, signed
+    INPUT_TYPES = {'c' : ('char', 1, True), 'b' : ('bool', 1, True), 'C' : ('unsigned char', 1, False),
+        's' : ('short', 2, True), 'S' : ('unsigned short', 2, False), 'i' : ('int', 4, True), 'I' : ('unsigned int', 4, False),
+        'u' : ('unsigned', 4, False), 'l' : ('long', 8, True), 'L' : ('unsigned long', 8, False), 'f' : ('float', 4, False), 'd' : ('double', 8, False)}
+
+    DEFAULT_DIRS = {'log' : 'logs/', 'output' : 'output/', 'verifiers': 'verifiers/', 'build_cache' : 'build_cache/'}
+    def __init__(self, path, output_dir, log_dir, timeout, sample_type, coverage_type, seed, input_size, execution_engine = DEFAULTS['execution_engine'], build_cache = DEFAULT_DIRS['build_cache'], final_coverage = DEFAULTS['final_coverage'], scratch_dir = None, objective = DEFAULTS['objective'], verifier_path = '/__VERIFIER.c', verifier_input_size_path = '/__VERIFIER_input_size.c'):
         self.path = path
         self.output_dir = output_dir
         self.log_dir = log_dir
+        self.sample_type = sample_type
         verifier_dir = 'verifiers_' + sample_type
         self.verifier_path = verifier_dir + verifier_path
         self.verifier_input_size_path = verifier_dir + verifier_input_size_path
-        self.verifier_xml_dump_path = verifier_dir + verifier_xml_dump_path
         self.codelines = {}
         self.pname = path[:-2].rsplit('/', 1)[-1]
         self._total_lines = 0
         self._state = Program.SAFE
+        # the timeout counts from the creation of the program, batch.py creates one after another in a process
+        self._init_time = time.time()
         self._timeout = timeout
         self._init_dirs()
-        self.coverage_type = coverage_type
+        self.coverage_type = self.NATIVE_COVERAGE_TYPES.get(coverage_type, self.MAP_COVERAGE_TYPES.get(coverage_type, coverage_type))
+        self.native_coverage = coverage_type in self.NATIVE_COVERAGE_TYPES
+        self.map_coverage = coverage_type in self.MAP_COVERAGE_TYPES
+        self._gcov_reader = None
+        self._native_runs = 0
+        self.final_coverage = self._select_final_coverage(final_coverage)
+        self.last_report_ids = None
+        self._report_totals = None
+        self.objective = self._select_objective(objective)
+        self.last_hit_buckets = None
         self.get_coverage_item_ids = self._select_coverage_item_type()
+        self._engine_type = self._select_execution_engine(execution_engine)
+        self._engine = None
+        self._fallback_engine = None
+        self._persistent_runs = 0
+        self._env = None
+        self._coverage_map = None
+        self._cmp_map = None
+        self._build_cache = BuildCache(build_cache)
+        self._coverage_build = None
+        self.gcda_dir = self._init_scratch_dir(scratch_dir)
+        self.last_input_size = 0
+        self.last_input_types = ''
+        self._source_scan = self.scan_source(path)
+        if input_size is None and self._source_scan[0] == 0:
+            # without calls of __VERIFIER_nondet_* the program reads no inputs, so the _input_size program is not needed
+            input_size = 0
+        self._start_compilations(input_size is None)
         self.input_size = input_size
         if input_size == None:
             self._compile_input_size()
             self.input_size = self._cal_input_size(seed)
 
+    @classmethod
+    def scan_source(cls, path):
+        # numbers of __VERIFIER_nondet_* calls and branches in the source, None if they can not be known without the preprocessor:
+        # a quoted #include or ## can hide calls, and a macro of any header can hide branches
+        try:
+            with open(path, errors='replace') as f:
+                source = f.read()
+        except OSError:
+            return None, None
+        nondets, branches, directives, hidden_calls = 0, 0, False, False
+        for match in cls.SOURCE_TOKENS.finditer(source):
+            directive, nondet, keyword, operator = match.groups()
+            if directive is not None:
+                directives = True
+                hidden_calls |= directive.endswith('"')
+            elif match.group() == '##':
+                hidden_calls = True
+            elif nondet is not None:
+                nondets += 1
+            elif keyword is not None or operator is not None:
+                branches += 1
+        return None if hidden_calls else nondets, None if directives else branches
+
     def _init_dirs(self):
         if self.output_dir[-1:] != '/':
             self.output_dir += '/'
@@ -188,7 +926,33 @@ class Program:
         if not os.path.isdir(self.log_dir):
             os.mkdir(self.log_dir)
 
+    def _init_scratch_dir(self, scratch_dir):
+        # the .gcda files are written and removed for every run, so they go to a private directory on tmpfs
+        # that is removed by close or at exit. several fuzzers can run in the same directory without sharing their .gcda files
+        if scratch_dir is None:
+            scratch_dir = CoverageMap.SHM_DIR if os.path.isdir(CoverageMap.SHM_DIR) else self.output_dir
+        os.makedirs(scratch_dir, exist_ok=True)
+        gcda_dir = tempfile.mkdtemp(dir=scratch_dir, prefix='fuzzer_%s_' % self.pname) + '/'
+        atexit.register(self._remove_scratch_dir)
+        return gcda_dir
+
+    def _remove_scratch_dir(self):
+        # the directories of the workers are inside the directory of the program they are copied from
+        shutil.rmtree(self.gcda_dir, ignore_errors=True)
+        atexit.unregister(self._remove_scratch_dir)
+
+    def _select_final_coverage(self, final_coverage):
+        if final_coverage not in self.FINAL_COVERAGES:
+            exit('ERROR: No such final coverage is supported!')
+        return final_coverage
+
     def _select_coverage_item_type(self):
+        if self.native_coverage:
+            return self.get_native_ids
+        if self.map_coverage:
+            return self.get_map_ids
+        if self.final_coverage != 'rerun':
+            return self.get_report_ids
         if self.coverage_type == 'line':
             return self.get_line_ids
         elif self.coverage_type == 'branch':
@@ -196,36 +960,230 @@ class Program:
 
         exit('ERROR: No such coverage type is supported!')
 
+    def _select_objective(self, objective):
+        if objective not in self.OBJECTIVES:
+            exit('ERROR: No such objective is supported!')
+        # only the program is compiled with trace-cmp, the harness defines the functions it calls
+        self._cmp_flags = ['-fsanitize-coverage=trace-cmp'] if objective == 'cmp_distance' else []
+        return objective
+
+    def _select_execution_engine(self, execution_engine):
+        if execution_engine in self.EXECUTION_ENGINES:
+            self.execution_engine = execution_engine
+            return self.EXECUTION_ENGINES[execution_engine]
+
+        exit('ERROR: No such execution engine is supported!')
+
+    def _get_engine(self):
+        if self._engine_type is None:
+            return None
+        if self._engine is None or not self._engine.alive:
+            self.stop_engine()
+            self._engine = self._engine_type(self.output_dir + self.pname, self._env)
+        if not self._engine.alive:
+            # the harness does not answer, fall back to a new process for each run
+            self._engine_type = None
+            self._engine = None
+        return self._engine
+
+    def _get_fallback_engine(self):
+        # a fresh process for each input that the persistent process cannot run
+        if self._fallback_engine is None or not self._fallback_engine.alive:
+            if self._fallback_engine is not None:
+                self._fallback_engine.close()
+            self._fallback_engine = ForkServer(self.output_dir + self.pname, self._env)
+        if not self._fallback_engine.alive:
+            return None
+        return self._fallback_engine
+
+    def stop_engine(self):
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+        if self._fallback_engine is not None:
+            self._fallback_engine.close()
+            self._fallback_engine = None
+
     def _cal_timeout(self):
         if self._timeout is not None:
-            remaining = self._timeout - time.time() + _init_time
+            remaining = self._timeout - time.time() + self._init_time
             return min(remaining, self.RUN_TIMEOUT)
         else:
             return self.RUN_TIMEOUT
 
+    def check_timeout(self):
+        # the inputs that the evaluation cache answers run no program, so the time is also checked before each evaluation
+        if self._timeout is not None and self._cal_timeout() <= 0:
+            raise subprocess.TimeoutExpired(self.path, self._timeout)
+
+    def _start_compilations(self, input_size):
+        # the variants are compiled concurrently at startup, each one is waited for when it is first needed
+        # only the program of the map build is instrumented, its gcov data is taken by the harness instead of libgcov
+        self._builders = {'coverage' : lambda: self._build([self.path, self.verifier_path], ['--coverage', '-D__VERIFIER_GCOV'], self._cmp_flags),
+            'map' : lambda: self._build([self.path, self.verifier_path], ['-D__VERIFIER_GCOV_MAP'], ['--coverage'] + self._cmp_flags, ['--coverage', '-Wl,--wrap=__gcov_init']),
+            'input_size' : lambda: self._build([self.path, self.verifier_input_size_path], ['--coverage'])}
+        names = ['coverage']
+        if self.map_coverage:
+            names.append('map')
+        if input_size:
+            names.append('input_size')
+        self._compiler = concurrent.futures.ThreadPoolExecutor(max_workers=len(self._builders))
+        self._compilations = {name : self._compiler.submit(self._builders[name]) for name in names}
+
+    def _compiled(self, name):
+        if name not in self._compilations:
+            self._compilations[name] = self._compiler.submit(self._builders[name])
+        return self._compilations[name].result()
+
+    def _build(self, sources, flags, program_flags = (), link_flags = ()):
+        # each source is compiled on its own, so that its .gcno file is written next to its object in the build.
+        # program_flags are only given for the program, link_flags only for linking
+        def build(build_dir):
+            objects = []
+            for source in sources:
+                obj = build_dir + os.path.basename(source)[:-2] + '.o'
+                returncode = subprocess.run(['gcc', '-c', source, '-o', obj, *flags, *(program_flags if source == self.path else ())]).returncode
+                if returncode != self.SAFE:
+                    return returncode
+                objects.append(obj)
+            return subprocess.run(['gcc', *objects, '-o', build_dir + self.pname, *flags, *link_flags]).returncode
+        return self._build_cache.get('program', sources, flags + list(program_flags) + list(link_flags), build)
+
+    def _install(self, build, suffix = '', coverage = False):
+        self._link(build + self.pname, self.output_dir + self.pname + suffix)
+        if not suffix and self._cmp_flags:
+            self._init_cmp_map(os.path.getsize(build + self.pname))
+        if coverage:
+            # the .gcda files go to gcda_dir, GCOV_PREFIX_STRIP removes the build directory from their path
+            self._coverage_build = build
+            self._link_gcno(self.gcda_dir)
+            self._update_env()
+
+    @staticmethod
+    def _link(source, link):
+        tmp = link + '.tmp'
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.symlink(os.path.abspath(source), tmp)
+        os.replace(tmp, link)
+
+    def _link_gcno(self, gcda_dir):
+        for name in os.listdir(self._coverage_build):
+            if name.endswith('.gcno'):
+                self._link(self._coverage_build + name, gcda_dir + name)
+
+    def _update_env(self):
+        self._env = dict(os.environ)
+        if self._coverage_build is not None:
+            self._env['GCOV_PREFIX'] = os.path.abspath(self.gcda_dir)
+            self._env['GCOV_PREFIX_STRIP'] = str(len([d for d in self._coverage_build.split('/') if d]))
+        if self._coverage_map is not None:
+            self._env[CoverageMap.ENV] = self._coverage_map.env
+        if self._cmp_map is not None:
+            self._env[CoverageMap.CMP_ENV] = self._cmp_map.env
+
     @_timeit
-    def _compile_program(self):
-        return subprocess.run(['gcc',self.path , self.verifier_path, '-o', self.output_dir + self.pname, '--coverage']).returncode
+    def _compile_program(self, report = False):
+        self.stop_engine()
+        build, returncode = self._compiled('coverage')
+        if returncode == self.SAFE:
+            self._install(build, coverage = True)
+            if self.map_coverage and not report:
+                returncode = self._compile_map_program()
+        return returncode
+
+    def _compile_map_program(self):
+        # the map build replaces the program of the coverage build, whose .gcno file and gcov give the ids of its counters.
+        # without a reader for the .gcno file or a map build, the program of the coverage build is read with gcov
+        reader = self._get_gcov_reader()
+        if not reader:
+            return self.SAFE
+        build, returncode = self._compiled('map')
+        if returncode != self.SAFE:
+            print('the coverage map is not supported by this gcc, gcov is used instead', file=sys.stderr)
+            return self.SAFE
+        self._install(build)
+        self._init_coverage_map(reader.gcda_size)
+        return returncode
+
+    def worker(self, index):
+        # a copy of the program that writes its .gcda files into its own directory via GCOV_PREFIX
+        program = copy.copy(self)
+        program.get_coverage_item_ids = program._select_coverage_item_type()
+        program._engine = None
+        program._fallback_engine = None
+        program._coverage_map = None
+        program._cmp_map = None
+        program.gcda_dir = '{}worker_{}/'.format(self.gcda_dir, index)
+        os.makedirs(program.gcda_dir, exist_ok=True)
+        if self._coverage_build is not None:
+            program._link_gcno(program.gcda_dir)
+
+        if self._coverage_map is not None:
+            program._init_coverage_map(self._coverage_map.bitmap.size)
+        if self._cmp_map is not None:
+            program._init_cmp_map(self._cmp_map.bitmap.size)
+        program._update_env()
+        return program
+
+    def close(self):
+        self.stop_engine()
+        if self._coverage_map is not None:
+            self._coverage_map.close()
+            self._coverage_map = None
+        if self._cmp_map is not None:
+            self._cmp_map.close()
+            self._cmp_map = None
+        self._remove_scratch_dir()
+
+    def _init_coverage_map(self, size):
+        if self._coverage_map is not None:
+            self._coverage_map.close()
+        self._coverage_map = CoverageMap(size)
+        self._update_env()
+
+    def _init_cmp_map(self, size):
+        if self._cmp_map is not None:
+            self._cmp_map.close()
+        self._cmp_map = CoverageMap(size, np.uint64)
+        self._update_env()
 
     @_timeit
     def _compile_input_size(self):
-        returncode = subprocess.run(['gcc', self.path, self.verifier_input_size_path, '-o', self.output_dir + self.pname + '_input_size', '--coverage']).returncode
+        build, returncode = self._compiled('input_size')
         if returncode == self.COMPILER_ERROR:
             exit('ERROR: Compliler Error!')
+        if returncode == self.SAFE:
+            self._install(build, '_input_size', coverage = True)
+
+    def xml_inputs(self, input_bytes, input_types):
+        # the <input> lines of a test case, decoded from the input bytes the same way the harness reads them
+        lines = []
+        offset = 0
+        for input_type in input_types:
+            name, size, signed = self.INPUT_TYPES[input_type]
+            width = size if self.sample_type == 'bytes' or size == 8 else 4
+            chunk = bytes(input_bytes[offset:offset + width])
+            offset += width
+            if self.sample_type == 'bytes':
+                value = int.from_bytes(chunk.ljust(width, b'\0'), 'little', signed = signed)
+            elif len(chunk) == 0:
+                value = 0
+            else:
+                # the real harness keeps the high bytes of what it read and moves signed values below zero
+                value = (int.from_bytes(chunk.ljust(width, b'\0'), 'little') >> 8 * (width - size)) - signed * (1 << 8 * size - 1)
 
-    @_timeit
-    def _compile_xml_dump(self):
-        return subprocess.run(['gcc', self.path, self.verifier_xml_dump_path, '-o', self.output_dir + self.pname + '_xml_dump']).returncode
-
-    def xml_dump(self, input_bytes):
-        output = subprocess.run(self.output_dir + self.pname + '_xml_dump', input=input_bytes, capture_output=True)
-        output = output.stdout.decode()
-        return output
+            if name == 'bool':
+                value = 'false' if value < 0 else 'true'
+            elif name in ('float', 'double'):
+                value = '%f' % struct.unpack('<f' if size == 4 else '<d', value.to_bytes(size, 'little'))[0]
+            lines.append('  <input type="{}">{}</input>\n'.format(name, value))
+        return ''.join(lines)
 
     def _cal_input_size(self, seed):
         input_size = -1
         try:
-            output = subprocess.run(self.output_dir + self.pname + '_input_size', capture_output=True, input = seed.to_bytes(4,'little', signed=False), timeout=self.INPUT_TIMEOUT)
+            output = subprocess.run(self.output_dir + self.pname + '_input_size', capture_output=True, input = seed.to_bytes(4,'little', signed=False), timeout=self.INPUT_TIMEOUT, env=self._env)
         except subprocess.TimeoutExpired:
             returncode = None
         else:
@@ -246,7 +1204,14 @@ class Program:
         return max(input_size, self.MIN_INPUT_SIZE)
 
     def cal_coverage_item_size(self):
-        gcov = self._gcov('-b', '-c')
+        if self.coverage_type == 'branch' and self.final_coverage == 'rerun' and self._source_scan[1] == 0:
+            # a source without branches has none for gcov either
+            return 0
+
+        if self._coverage_build is None:
+            # without _compile_input_size there are no .gcno files to count the lines and branches from yet
+            self._compile_program()
+        gcov = self._gcov('-b', '-c', '-n')
         self.delete_gcda()
         gcov_lines = gcov.split('\n')
         if self.coverage_type == 'line':
@@ -261,34 +1226,73 @@ class Program:
                 break
             
         if gcov_lines[index + 2].startswith('No'):
+            self._report_totals = self._gcov_total(gcov_lines[index + 1]), 0
             return 0
         else:
-            text = gcov_lines[index + offset]
-            return int(text[text.rfind('f')+1:])
+            self._report_totals = self._gcov_total(gcov_lines[index + 1]), self._gcov_total(gcov_lines[index + 2])
+            return self._gcov_total(gcov_lines[index + offset])
+
+    @staticmethod
+    def _gcov_total(text):
+        if text.startswith('No'):
+            return 0
+        return int(text[text.rfind('f')+1:])
 
     @_timeit
     def delete_gcda(self):
-        if os.path.isfile(self.pname + '.gcda'):
-            os.remove(self.pname+'.gcda')
-        if os.path.isfile('__VERIFIER.gcda'):
-            os.remove('__VERIFIER.gcda')
+        if os.path.isfile(self.gcda_dir + self.pname + '.gcda'):
+            os.remove(self.gcda_dir + self.pname + '.gcda')
+        if os.path.isfile(self.gcda_dir + '__VERIFIER.gcda'):
+            os.remove(self.gcda_dir + '__VERIFIER.gcda')
+
+    def _run_engine(self, engine, input_bytes):
+        if self._coverage_map is not None:
+            self._coverage_map.reset()
+        if self._cmp_map is not None:
+            self._cmp_map.reset()
+        if engine is None:
+            output = subprocess.run(self.output_dir + self.pname, input = input_bytes, timeout=self._cal_timeout(), capture_output=True, env=self._env)
+            return output.returncode, output.stdout
+        return engine.run(input_bytes, self._cal_timeout())
+
+    def _rerun_engine(self, input_bytes, fallback):
+        # the input crashed or exited the persistent process, it is run by a fork server. a fork server that died
+        # is started again, and if that one dies too, every run gets a new process
+        if not fallback:
+            try:
+                if self._engine_type is PersistentServer:
+                    return self._run_engine(self._get_fallback_engine(), input_bytes)
+                return self._run_engine(self._get_engine(), input_bytes)
+            except ChildProcessError:
+                if self._engine_type is ForkServer:
+                    print('WARNING: the fork server of %s died twice, a new process runs each input' % self.pname, file=sys.stderr)
+                    self.stop_engine()
+                    self._engine_type = None
+        return self._run_engine(None, input_bytes)
 
     @_timeit
-    def _run(self, input_bytes):
-        output = subprocess.run(self.output_dir + self.pname, input = input_bytes, timeout=self._cal_timeout(), capture_output=True)
-        returncode = output.returncode
-        output = output.stdout.decode()
+    def _run(self, input_bytes, fallback = False):
         try:
-            input_size = int(output[output.rfind('n') + 1:])
+            returncode, output = self._run_engine(self._get_fallback_engine() if fallback else self._get_engine(), input_bytes)
+        except ChildProcessError:
+            returncode, output = self._rerun_engine(input_bytes, fallback)
+
+        output = output.decode()
+        index = output.rfind('n')
+        try:
+            input_size = int(output[index + 1:])
         except ValueError:
             input_size = 0
+        types_index = output.rfind('t', 0, index)
 
+        self.last_input_size = input_size
+        self.last_input_types = output[types_index + 1:index] if input_size > 0 and types_index >= 0 else ''
         self.input_size = min(max(self.input_size, input_size),self.MAX_INPUT_SIZE)
         return returncode
 
     @_timeit
     def _gcov(self, *args):
-        return subprocess.run(['gcov', self.pname + '.gcda', *args], capture_output = True, timeout=self._cal_timeout()).stdout.decode()
+        return subprocess.run(['gcov', self.gcda_dir + self.pname + '.gcda', *args], capture_output = True, timeout=self._cal_timeout()).stdout.decode()
 
     def _coverage(self, output):
         if len(output) == 0:
@@ -297,49 +1301,187 @@ class Program:
     @staticmethod
     @_timeit
     def cal_lines(gcov):
-        output_lines = set()
+        output_lines = []
         if len(gcov) == 0:
-            return output_lines
+            return CoverageItemIds()
         
         lines = gcov.split('\n')
         for i, line in enumerate(lines):
             if line == '':
                 break
             if line[0] == ' ' and line[8] != '-' and line[8] != '#':
-                output_lines.add(i)
-        return output_lines
+                output_lines.append(i)
+        return CoverageItemIds.from_ids(output_lines)
 
     @staticmethod
     @_timeit
     def cal_branches(gcov):
-        output_branches = set()
+        output_branches = []
         if len(gcov) == 0:
-            return output_branches
+            return CoverageItemIds()
         
         lines = gcov.split('\n')
         for i, line in enumerate(lines):
             if line == '':
                 break
             if line[0] == 'b' and line[10] == 't' and int(line[15:17]) > 0:
-                output_branches.add(i)
+                output_branches.append(i)
 
-        return output_branches
-    
-    # @_timeit
+        return CoverageItemIds.from_ids(output_branches)
+
+    @staticmethod
+    @_timeit
+    def cal_counts(gcov, coverage_type):
+        # ids and execution counts of the lines or the taken branches in the output of gcov -c, like cal_lines and cal_branches read them
+        ids, counts = [], []
+        for i, line in enumerate(gcov.split('\n')):
+            if line == '':
+                break
+            if coverage_type == 'line' and line[0] == ' ':
+                count = line.split(':', 1)[0].strip().rstrip('*')
+            elif coverage_type == 'branch' and line[0] == 'b' and line[10] == 't':
+                count = line[16:].split(' ', 1)[0]
+            else:
+                continue
+            if count.isdigit():
+                ids.append(i)
+                counts.append(int(count))
+        return ids, counts
+
+    @classmethod
+    def hit_buckets(cls, ids, counts):
+        # the bucket 0 to 7 of the hit count of each executed item
+        ids, counts = np.asarray(ids), np.asarray(counts)
+        executed = counts > 0
+        return dict(zip(ids[executed].tolist(), np.searchsorted(cls.HIT_BUCKETS, counts[executed]).tolist()))
+
+    def _count_hits(self, gcov):
+        if self.objective != 'coverage':
+            self.last_hit_buckets = self.hit_buckets(*self.cal_counts(gcov, self.coverage_type))
+
+    @_timeit
     def get_line_ids(self):
         gcov = self._gcov('-t')
         self.delete_gcda()
+        self._count_hits(gcov)
         return self.cal_lines(gcov)
 
-    # @_timeit
+    @_timeit
     def get_branche_ids(self):
         gcov = self._gcov('-b', '-c', '-t')
         self.delete_gcda()
+        self._count_hits(gcov)
         return self.cal_branches(gcov)
 
+    @_timeit
+    def get_report_ids(self):
+        # the lines and branches of each run are kept, so the final coverage is known without running the samples again
+        gcov = self._gcov('-b', '-c', '-t')
+        self.delete_gcda()
+        self._count_hits(gcov)
+        self.last_report_ids = self.cal_lines(gcov), self.cal_branches(gcov)
+        if self.coverage_type == 'line':
+            return self.last_report_ids[0]
+        return self.last_report_ids[1]
+
+    def _get_gcov_reader(self):
+        if self._gcov_reader is None:
+            try:
+                self._gcov_reader = GcovReader(self.gcda_dir + self.pname + '.gcno', self._gcov('-t'), self._gcov('-b', '-c', '-t'))
+            except (OSError, ValueError, IndexError, struct.error) as e:
+                print('native coverage is not supported for this program, gcov is used instead:', e, file=sys.stderr)
+                self._gcov_reader = False
+        return self._gcov_reader
+
+    def _get_gcov_ids(self):
+        if self.final_coverage != 'rerun':
+            return self.get_report_ids()
+        if self.coverage_type == 'line':
+            return self.get_line_ids()
+        return self.get_branche_ids()
+
+    def _reader_ids(self, reader, counters):
+        # the line or branch ids of the counters of a run, and the report ids and hit count buckets if they are needed
+        line = self.coverage_type == 'line'
+        branch_ids = reader.branch_ids(counters)
+        self.last_report_ids = (reader.line_ids(counters, report = True), branch_ids) if self.final_coverage != 'rerun' else None
+        if self.objective != 'coverage':
+            self.last_hit_buckets = self.hit_buckets(*reader.counts(counters, line = line))
+        return reader.line_ids(counters) if line else branch_ids
+
+    @_timeit
+    def get_native_ids(self):
+        reader = self._get_gcov_reader()
+        if not reader:
+            return self._get_gcov_ids()
+
+        ids = self._reader_ids(reader, reader.read(self.gcda_dir + self.pname + '.gcda'))
+        self._native_runs += 1
+        if self._native_runs <= self.NATIVE_CHECKS:
+            gcov = self._gcov('-b', '-c', '-t')
+            checked = ids == (self.cal_lines(self._gcov('-t')) if self.coverage_type == 'line' else self.cal_branches(gcov))
+            if self.last_report_ids is not None:
+                checked = checked and self.last_report_ids == (self.cal_lines(gcov), self.cal_branches(gcov))
+            if not checked:
+                print('native coverage differs from gcov, gcov is used instead', file=sys.stderr)
+                self._gcov_reader = False
+                return self._get_gcov_ids()
+
+        self.delete_gcda()
+        return ids
+
+    @_timeit
+    def get_map_ids(self):
+        if self._coverage_map is None:
+            return self._get_gcov_ids()
+        return self._reader_ids(self._gcov_reader, self._gcov_reader.parse(self._coverage_map.bitmap))
+
+    def get_accumulated_coverages(self, report_ids):
+        line_ids, branch_ids = CoverageItemIds(), CoverageItemIds()
+        for lines, branches in report_ids:
+            line_ids.update(lines)
+            branch_ids.update(branches)
+        line_total, branch_total = self._report_totals
+        line_coverage = round(100 * len(line_ids) / line_total, self.COV_DIGITS) if line_total > 0 else 0
+        branch_coverage = round(100 * len(branch_ids) / branch_total, self.COV_DIGITS) if branch_total > 0 else 0
+        return line_coverage, branch_coverage
+
+    def evaluate(self, input_bytes):
+        if _profiler.first_evaluation is None:
+            _profiler.record_first_evaluation(time.time() - self._init_time)
+        evaluation = self._evaluation(self._run(input_bytes))
+        if self._engine_type is PersistentServer:
+            evaluation = self._check_persistent(input_bytes, evaluation)
+        return evaluation
+
+    def _check_persistent(self, input_bytes, evaluation):
+        self._persistent_runs += 1
+        if self._persistent_runs > self.PERSISTENT_CHECKS and self._persistent_runs % self.PERSISTENT_CHECK_INTERVAL != 0:
+            return evaluation
+        checked = self._evaluation(self._run(input_bytes, fallback = True))
+        if checked != evaluation:
+            # main is not re-entrant, its global state is carried over from one input to the next
+            self.stop_engine()
+            self._engine_type = ForkServer
+        return checked
+
+    def _evaluation(self, returncode):
+        evaluation = returncode, self.get_coverage_item_ids(), self.last_input_size, self.last_input_types, self.last_report_ids
+        if self.objective == 'coverage':
+            return evaluation
+        return evaluation + (self.last_hit_buckets, self.get_closeness())
+
+    def get_closeness(self):
+        # closeness of the operands of the executed comparisons by their offset
+        if self._cmp_map is None:
+            return None
+        offsets = np.flatnonzero(self._cmp_map.bitmap)
+        distances = ~self._cmp_map.bitmap[offsets]
+        return dict(zip(offsets.tolist(), (self.CMP_CLOSENESS - np.log2(distances.astype(float) + 1)).tolist()))
+
     @_timeit
     def get_line_and_branch_coverages(self):
-        gcov = self._gcov('-b', '-c')
+        gcov = self._gcov('-b', '-c', '-n')
         self.delete_gcda()
         gcov_lines = gcov.split('\n')
         index = -1
@@ -363,10 +1505,17 @@ class Program:
 
 class CMA_ES:
     DEFAULTS = {'seed' : None, 'init_popsize' : 10, 'max_popsize' : 160, 'max_gens' : 1000, 'popsize_scale' : 4, 'max_evaluations' : np.inf, 'x0' : [128], 'sigma0' : 0.3*256, 'bounds' : [0, 256]}
+    STATE = ('input_size', 'evaluations', '_options', '_args')
+    # attributes of CMAEvolutionStrategy that only depend on the dimension, the population size and the bounds, a restart keeps them
+    RESTART_KEEPS = ('opts', 'sp', 'sp0', 'const', 'boundary_handler', 'logger', 'inopts', 'inputargs')
 
     def __init__(self, seed, input_size, init_popsize, max_popsize, max_gens, popsize_scale, max_evaluations):
         self.input_size = input_size
-        self._options = dict(popsize = init_popsize, verb_disp = 0, seed = seed - 1, bounds = [self.DEFAULTS['bounds'][0], self.DEFAULTS['bounds'][1]])
+        # verb_log = 0: CMAEvolutionStrategy writes no outcmaes/ files
+        self._options = dict(popsize = init_popsize, verb_disp = 0, verb_log = 0, seed = seed - 1, bounds = [self.DEFAULTS['bounds'][0], self.DEFAULTS['bounds'][1]])
+        self._evaluated_options = {}
+        # a strategy and its state after construction for each population size of the current dimension, see _restart
+        self._strategies = {}
         self._args = dict(x0 = self.DEFAULTS['x0'] * self.input_size, sigma0 = self.DEFAULTS['sigma0'])
         self._max_popsize = max_popsize
         self._max_gens = max_gens
@@ -403,10 +1552,51 @@ class CMA_ES:
         else:
             self._options['fixed_variables'] = fixed_variables
         
-        self._es = cma.CMAEvolutionStrategy(**self._args, inopts=self._options)
+        key = (len(self._args['x0']), self._options['popsize'])
+        if fixed_variables is None and key in self._strategies:
+            self._es = self._restart(*self._strategies[key])
+        else:
+            self._es = cma.CMAEvolutionStrategy(**self._args, inopts=self._restart_options())
+            if fixed_variables is None:
+                # only the strategies of the current dimension are kept, the input size rarely goes back
+                self._strategies = {k: v for k, v in self._strategies.items() if k[0] == key[0]}
+                self._strategies[key] = self._es, self._initial_state(self._es)
         self.result = self._es.result
         return self
 
+    def _initial_state(self, es):
+        return copy.deepcopy({name: value for name, value in es.__dict__.items() if name not in self.RESTART_KEEPS})
+
+    def _restart(self, es, state):
+        # the mean, sigma, covariance matrix, evolution paths, counters and stopping criteria of the strategy are reset
+        # to their state after construction, then the mean, sigma, stds and seed are set like CMAEvolutionStrategy does
+        for name in list(es.__dict__):
+            if name not in self.RESTART_KEEPS and name not in state:
+                delattr(es, name)
+        es.__dict__.update(copy.deepcopy(state))
+        es.opts['seed'], es.opts['CMA_stds'] = self._options['seed'], self._options['CMA_stds']
+        np.random.seed(es.opts['seed'])
+        es._set_x0(self._args['x0'])
+        es.sigma0 = es.sigma = self._args['sigma0']
+        es.mean = es.gp.geno(np.array(es.x0, copy=True), from_bounds=es.boundary_handler.inverse, copy=False)
+        es.mean0 = np.array(es.mean, copy=True)
+        stds = self._options['CMA_stds']
+        es.sigma_vec0 = 1.0 if stds is None else np.array(stds, dtype=float)
+        es.sigma_vec = cma.transformations.DiagonalDecoding(es.sigma_vec0)
+        return es
+
+    def _restart_options(self):
+        # the string defaults of CMAOptions only depend on the dimension and the population size, so they are evaluated
+        # once for each pair and every restart gets a copy with its own seed, stds and fixed variables
+        dimension = len(self._args['x0']) - len(self._options['fixed_variables'] or {})
+        key = (dimension, self._options['popsize'])
+        if key not in self._evaluated_options:
+            options = cma.CMAOptions(dict(self._options, CMA_stds = None, fixed_variables = None)).complement()
+            self._evaluated_options[key] = dict(options.evalall({'N' : dimension}))
+        options = copy.deepcopy(self._evaluated_options[key])
+        options.update(seed = self._options['seed'], CMA_stds = self._options['CMA_stds'], fixed_variables = self._options['fixed_variables'])
+        return options
+
     def get_bounds(self):
         return self.DEFAULTS['bounds']
 
@@ -429,6 +1619,18 @@ class CMA_ES:
         self.input_size = max(input_size, self.input_size)
         self.result = self._es.result
 
+    def get_state(self):
+        # the settings come from the arguments of the resumed run, the strategy is pickled by cma itself
+        state = {key: copy.deepcopy(getattr(self, key)) for key in self.STATE}
+        state['es'] = self._es.pickle_dumps()
+        return state
+
+    def set_state(self, state):
+        for key in self.STATE:
+            setattr(self, key, state[key])
+        self._es = pickle.loads(state['es'])
+        self.result = self._es.result
+
     def _reset_popsize(self):
         self._options['popsize'] = self._init_popsize
 
@@ -438,81 +1640,164 @@ class CMA_ES:
         return self._options['popsize'] <= self._max_popsize
 
 
+class CoverageItemIds:
+    # set of coverage item ids stored as the bits of an int, so unions and counts cost O(words)
+    __slots__ = ('bits',)
+
+    if hasattr(int, 'bit_count'):
+        _popcount = staticmethod(int.bit_count)
+    else:
+        _popcount = staticmethod(lambda bits: bin(bits).count('1'))
+
+    def __init__(self, bits = 0):
+        self.bits = bits
+
+    @classmethod
+    def from_ids(cls, ids):
+        ids = list(ids)
+        if len(ids) == 0:
+            return cls()
+        bitmap = bytearray((max(ids) >> 3) + 1)
+        for i in ids:
+            bitmap[i >> 3] |= 1 << (i & 7)
+        return cls(int.from_bytes(bitmap, 'little'))
+
+    @classmethod
+    def intersection(cls, *others):
+        bits = others[0].bits
+        for other in others[1:]:
+            bits &= other.bits
+        return cls(bits)
+
+    def update(self, other):
+        self.bits |= other.bits
+
+    def __or__(self, other):
+        return CoverageItemIds(self.bits | other.bits)
+
+    def __and__(self, other):
+        return CoverageItemIds(self.bits & other.bits)
+
+    def __sub__(self, other):
+        return CoverageItemIds(self.bits & ~other.bits)
+
+    def __len__(self):
+        return self._popcount(self.bits)
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __eq__(self, other):
+        return isinstance(other, CoverageItemIds) and self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __iter__(self):
+        bits, offset = self.bits, 0
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            yield offset + index
+            bits >>= index + 1
+            offset += index + 1
+
+    def __repr__(self):
+        return 'CoverageItemIds(%s)' % list(self)
+
+
 class SampleHolder:
-    def __init__(self, sample = None, coverage_item_ids = set(), score = -1, stds = []):
+    __slots__ = ('sample', 'coverage_item_ids', 'score', 'stds', 'input_size', 'evaluation', 'tie_breaker')
+
+    def __init__(self, sample = None, coverage_item_ids = None, score = -1, stds = [], input_size = 0, evaluation = None):
         self.sample = sample
-        self.coverage_item_ids = coverage_item_ids
+        self.coverage_item_ids = CoverageItemIds() if coverage_item_ids is None else coverage_item_ids
         self.score = score
         self.stds = stds
+        self.input_size = input_size
+        self.evaluation = evaluation
+        self.tie_breaker = 0
         
-    def update(self, sample, coverage_item_ids, score):
-        optimized = score > self.score
+    def update(self, sample, coverage_item_ids, score, input_size = 0, evaluation = None, tie_breaker = 0):
+        # the tie breaker of the objective only decides between samples with the same score
+        optimized = (score, tie_breaker) > (self.score, self.tie_breaker)
         if optimized:
             self.coverage_item_ids = coverage_item_ids
             self.sample = sample
             self.score = score
+            self.input_size = input_size
+            self.evaluation = evaluation
+            self.tie_breaker = tie_breaker
         return optimized
 
     def clear(self):
         self.sample = None
-        self.coverage_item_ids = set()
+        self.coverage_item_ids = CoverageItemIds()
         self.score = 0
+        self.input_size = 0
+        self.evaluation = None
+        self.tie_breaker = 0
 
 
 class SampleCollector:
+    # what a checkpoint keeps, the settings come from the arguments of the resumed run
+    STATE = ('total_sample_holders', 'total_coverage_item_ids', 'optimized_sample_holders', 'optimized_coverage_item_ids', 'best_sample_holder', 'current_score', 'total_score')
+
     def __init__(self, save_interesting, coverage_item_size):
         self.total_sample_holders = [] 
-        self.total_coverage_item_ids = set()
+        self.total_coverage_item_ids = CoverageItemIds()
         self.coverage_item_size = coverage_item_size
         self.optimized_sample_holders = []
-        self.optimized_coverage_item_ids = set()
+        self.optimized_coverage_item_ids = CoverageItemIds()
         self.best_sample_holder = SampleHolder()
         self.current_score = 0
         self.total_score = 0
         self.save_interesting = save_interesting
 
-    def update(self, sample, current_coverage_item_ids, score):
+    def update(self, sample, current_coverage_item_ids, score, input_size = 0, evaluation = None, tie_breaker = 0):
         sample_holder = self.best_sample_holder
-        if sample_holder.update(sample, current_coverage_item_ids, score) and not self.coverage_item_size == 0:
+        if sample_holder.update(sample, current_coverage_item_ids, score, input_size, evaluation, tie_breaker) and not self.coverage_item_size == 0:
             self.current_score = sample_holder.score
             if not self.save_interesting:
                 self.total_score = len(current_coverage_item_ids | self.total_coverage_item_ids)
 
     @_timeit
-    def get_executed_coverage_item_ids(self, sample, current_coverage_item_ids):
+    def get_executed_coverage_item_ids(self, sample, current_coverage_item_ids, input_size = 0, evaluation = None, tie_breaker = 0):
         if self.save_interesting:
-            self.check_interesting(sample, current_coverage_item_ids)
+            self.check_interesting(sample, current_coverage_item_ids, evaluation)
 
         output_ids = self.optimized_coverage_item_ids | current_coverage_item_ids
-        self.update(sample, current_coverage_item_ids, len(output_ids))
+        self.update(sample, current_coverage_item_ids, len(output_ids), input_size, evaluation, tie_breaker)
 
         return output_ids        
 
-    # @_timeit
-    def check_interesting(self, sample, current_coverage_item_ids):
+    @_timeit
+    def check_interesting(self, sample, current_coverage_item_ids, evaluation = None):
         pre_score = len(self.total_coverage_item_ids)
         self.total_coverage_item_ids.update(current_coverage_item_ids)
         self.total_score = len(self.total_coverage_item_ids)
         is_interesting = pre_score < self.total_score
 
         if is_interesting:
-            self.total_sample_holders.append(SampleHolder(sample, current_coverage_item_ids))
+            self.total_sample_holders.append(SampleHolder(sample, current_coverage_item_ids, evaluation = evaluation))
 
     def add_best(self, sample, stds):
         sample = self.best_sample_holder.sample
         coverage_item_ids = self.best_sample_holder.coverage_item_ids
+        input_size = self.best_sample_holder.input_size
+        evaluation = self.best_sample_holder.evaluation
             
         pre_score = len(self.optimized_coverage_item_ids)
         self.optimized_coverage_item_ids.update(coverage_item_ids)
         optimized = pre_score < len(self.optimized_coverage_item_ids)
 
         if optimized or len(self.total_sample_holders) == 0:
-            self.optimized_sample_holders.append(SampleHolder(sample, coverage_item_ids, stds = stds))
+            self.optimized_sample_holders.append(SampleHolder(sample, coverage_item_ids, stds = stds, input_size = input_size))
             if not self.save_interesting:
                 pre_total_score = len(self.total_coverage_item_ids)
                 self.total_coverage_item_ids.update(coverage_item_ids)
                 if pre_total_score < len(self.total_coverage_item_ids):
-                    self.total_sample_holders.append(SampleHolder(sample, coverage_item_ids, stds = stds))
+                    self.total_sample_holders.append(SampleHolder(sample, coverage_item_ids, stds = stds, input_size = input_size, evaluation = evaluation))
         
         self.best_sample_holder.clear()
 
@@ -521,12 +1806,12 @@ class SampleCollector:
     def remove_common_coverage_item_ids(self):
         if len(self.optimized_coverage_item_ids) == 0:
             return
-        common_ids = set.intersection(*[sample.coverage_item_ids for sample in self.optimized_sample_holders])
+        common_ids = CoverageItemIds.intersection(*[sample.coverage_item_ids for sample in self.optimized_sample_holders])
         self.optimized_coverage_item_ids -= common_ids
 
     def reset_optimized(self):
         self.optimized_sample_holders = []
-        self.optimized_coverage_item_ids = set()
+        self.optimized_coverage_item_ids = CoverageItemIds()
         self.best_sample_holder = SampleHolder()
         self.current_coverage = 0
         self.current_score = 0
@@ -538,7 +1823,7 @@ class SampleCollector:
         sample_holder = self.optimized_sample_holders[0]
         self.optimized_sample_holders = self.optimized_sample_holders[1:]
         # self.optimized_coverage_item_ids -= sample_holder.coverage_item_ids
-        self.optimized_coverage_item_ids = set()
+        self.optimized_coverage_item_ids = CoverageItemIds()
         for holder in self.optimized_sample_holders:
             self.optimized_coverage_item_ids.update(holder.coverage_item_ids)
 
@@ -547,6 +1832,13 @@ class SampleCollector:
     def get_optimized_samples(self):
         return [s.sample for s in self.optimized_sample_holders]
 
+    def get_state(self):
+        return {key: getattr(self, key) for key in self.STATE}
+
+    def set_state(self, state):
+        for key in self.STATE:
+            setattr(self, key, state[key])
+
     def get_total_samples(self):
         return [s.sample for s in self.total_sample_holders]
 
@@ -571,9 +1863,164 @@ class SampleCollector:
         return self.cal_size(size)
 
 
+class EvaluationCache:
+    # (returncode, coverage item ids, input size) of executed inputs, the least recently used are dropped first.
+    # the program reads only the first input size units of an input, so the evaluation is also kept for
+    # that prefix and any input starting with it is not executed again
+    def __init__(self, size, unit_size):
+        self.size = size
+        self.unit_size = unit_size
+        self.hits = 0
+        self.misses = 0
+        self._evaluations = collections.OrderedDict()
+        self._prefixes = collections.OrderedDict()
+        self._prefix_lengths = collections.Counter()
+
+    def _get_prefix(self, key):
+        for length in self._prefix_lengths:
+            if length <= len(key):
+                evaluation = self._prefixes.get(key[:length])
+                if evaluation is not None:
+                    self._prefixes.move_to_end(key[:length])
+                    return evaluation
+        return None
+
+    def get(self, input_bytes):
+        key = bytes(input_bytes)
+        evaluation = self._evaluations.get(key)
+        if evaluation is not None:
+            self._evaluations.move_to_end(key)
+        else:
+            evaluation = self._get_prefix(key)
+
+        if evaluation is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return evaluation
+
+    def _put_prefix(self, key, evaluation):
+        returncode, coverage_item_ids, input_size = evaluation[:3]
+        length = input_size * self.unit_size
+        # without the input size trailer (crash, _exit) or with reads after the end of the input, the prefix is unknown
+        if returncode < 0 or length <= 0 or length > len(key):
+            return
+        prefix = key[:length]
+        if prefix not in self._prefixes:
+            self._prefix_lengths[length] += 1
+        self._prefixes[prefix] = evaluation
+        if len(self._prefixes) > self.size:
+            prefix, _ = self._prefixes.popitem(last = False)
+            self._prefix_lengths[len(prefix)] -= 1
+            if self._prefix_lengths[len(prefix)] == 0:
+                del self._prefix_lengths[len(prefix)]
+
+    def put(self, input_bytes, evaluation):
+        if self.size <= 0:
+            return
+        key = bytes(input_bytes)
+        self._evaluations[key] = evaluation
+        if len(self._evaluations) > self.size:
+            self._evaluations.popitem(last = False)
+        self._put_prefix(key, evaluation)
+
+
+class SurrogateFilter:
+    # a linear-quadratic model of the objective ranks the population of CMA-ES, only the best ranked fraction and a few
+    # random samples are executed. the kendall tau between the model and the executed values decides if the model is
+    # used in the next generation, without it the whole population is executed
+    DEFAULTS = {'exploration' : 0.1, 'tau_threshold' : 0.5}
+
+    def __init__(self, fraction, exploration = DEFAULTS['exploration'], tau_threshold = DEFAULTS['tau_threshold']):
+        self.fraction = fraction
+        self.exploration = exploration
+        self.tau_threshold = tau_threshold
+        self.screened = 0
+        self.reset()
+
+    def reset(self):
+        # the objective depends on the optimized coverage item ids, so the data of one CMA-ES run is not reused in the next
+        self._model = cma.fitness_models.LQModel()
+        self.active = False
+        self.tau = 0
+
+    def select(self, samples):
+        # indices of the samples to execute, and the values of the model once it has more data than a linear model needs
+        everything = list(range(len(samples)))
+        if self._model.size <= len(samples[0]) + 1:
+            return everything, None
+        predictions = [self._model.eval(sample) for sample in samples]
+        if not self.active:
+            return everything, predictions
+
+        ranked = [int(i) for i in np.argsort(predictions, kind='stable')]
+        number = max(int(np.ceil(self.fraction * len(samples))), 1)
+        explored = random.sample(ranked[number:], min(len(samples) - number, int(np.ceil(self.exploration * len(samples)))))
+        return sorted(ranked[:number] + explored), predictions
+
+    def tell(self, samples, executed, values, predictions):
+        # the values of the whole population for CMA-ES
+        if predictions is not None and len(executed) >= 3:
+            self.tau = cma.fitness_models.kendall_tau(values, [predictions[i] for i in executed])
+            self.active = self.tau >= self.tau_threshold
+        with warnings.catch_warnings():
+            # the model takes samples with the same sum for the same sample
+            warnings.simplefilter('ignore')
+            for i, value in zip(executed, values):
+                self._model.add_data_row(samples[i], value)
+        self._model.sort()
+        if len(executed) == len(samples):
+            return values
+
+        # the samples that were not executed rank behind the executed ones, in the order of the model
+        told = [None] * len(samples)
+        for i, value in zip(executed, values):
+            told[i] = value
+        screened = [i for i in range(len(samples)) if told[i] is None]
+        offset = max(values) + 1 - min(predictions[i] for i in screened)
+        for i in screened:
+            told[i] = predictions[i] + offset
+        self.screened += len(screened)
+        return told
+
+
+class EvalParallel:
+    # evaluates the samples of a population concurrently, each worker runs its own copy of the program
+    def __init__(self, program, workers):
+        self._programs = queue.Queue()
+        for index in range(workers):
+            self._programs.put(program.worker(index))
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers)
+
+    def _evaluate(self, input_bytes):
+        program = self._programs.get()
+        try:
+            return program.evaluate(input_bytes)
+        finally:
+            self._programs.put(program)
+
+    def submit(self, input_bytes):
+        return self._pool.submit(self._evaluate, input_bytes)
+
+    def close(self):
+        self._pool.shutdown()
+        while not self._programs.empty():
+            self._programs.get().close()
+
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    # fuzzer.py pickles its classes as __main__ and batch.py as fuzzer, either checkpoint can be resumed by the other
+    def find_class(self, module, name):
+        if module in ('__main__', __name__) and name in globals():
+            return globals()[name]
+        return super().find_class(module, name)
+
+
 class Fuzzer:
-    DEFAULTS = {'timeout' : 14 * 60, 'sample_type' : 'bytes', 'hot_restart_threshold' : 0.5*0.3*256}
+    DEFAULTS = {'timeout' : 14 * 60, 'sample_type' : 'bytes', 'hot_restart_threshold' : 0.5*0.3*256, 'workers' : 1, 'cache_size' : 10000, 'checkpoint_interval' : 60, 'islands' : 1, 'surrogate_fraction' : None}
     VERIFIER_ERROS = {Program.SAFE : 'SAFE', Program.ERROR : 'ERROR', Program.ASSUME : 'ASSUME_ERROR', Program.OVER_MAX_INPUT_SIZE: 'OVER_MAX_INPUT_SIZE'}
+    # bytes of an encoded sample component, one unit of the input size reported by the verifier
+    UNIT_SIZES = {'bytes' : 1, 'real' : 4}
     PARSING_SCALE = 2 ** (32 - 8)
     UNSIGNED_INT_MIN = 0
     UNSIGNED_INT_MAX = 2 ** 32 - 1
@@ -582,11 +2029,16 @@ class Fuzzer:
     OVER_MAX_EVAL = 'evaluations are over max evaluations'
     NO_INTERESTING_BRANCHES = 'the given program has no interesting branches'
     NO_INPUT = 'the given program takes no inputs'
+    CHECKPOINT_VERSION = 4
+    # seconds after the timeout until islands that did not stop are terminated
+    ISLAND_GRACE = 30
 
-    def __init__(self, program_path, no_reset = False, live_logs = False, hot_restart = False, save_interesting = False, strategy = None, input_size = None, write_xml_tests = False,
-    sample_type = DEFAULTS['sample_type'], timeout = DEFAULTS['timeout'],  hot_restart_threshold = DEFAULTS['hot_restart_threshold'], coverage_type = Program.DEFAULTS['coverage_type'],
-    output_dir = Program.DEFAULT_DIRS['output'], log_dir = Program.DEFAULT_DIRS['log'], seed = CMA_ES.DEFAULTS['seed'], init_popsize = CMA_ES.DEFAULTS['init_popsize'],
+    def __init__(self, program_path, no_reset = False, live_logs = False, profile = False, trace_file = None, hot_restart = False, fix_unread = False, save_interesting = False, strategy = None, input_size = None, write_xml_tests = False,
+    sample_type = DEFAULTS['sample_type'], timeout = DEFAULTS['timeout'],  hot_restart_threshold = DEFAULTS['hot_restart_threshold'], coverage_type = Program.DEFAULTS['coverage_type'], execution_engine = Program.DEFAULTS['execution_engine'], final_coverage = Program.DEFAULTS['final_coverage'], objective = Program.DEFAULTS['objective'], scratch_dir = None, workers = DEFAULTS['workers'], cache_size = DEFAULTS['cache_size'], resume = False, checkpoint_interval = DEFAULTS['checkpoint_interval'], islands = DEFAULTS['islands'], surrogate_fraction = DEFAULTS['surrogate_fraction'],
+    output_dir = Program.DEFAULT_DIRS['output'], log_dir = Program.DEFAULT_DIRS['log'], build_cache = Program.DEFAULT_DIRS['build_cache'], seed = CMA_ES.DEFAULTS['seed'], init_popsize = CMA_ES.DEFAULTS['init_popsize'],
     max_popsize = CMA_ES.DEFAULTS['max_popsize'], max_gens = CMA_ES.DEFAULTS['max_gens'], max_evaluations = CMA_ES.DEFAULTS['max_evaluations'], popsize_scale = CMA_ES.DEFAULTS['popsize_scale']):
+        # the islands are fuzzers with the same arguments apart from their seeds, population sizes and directories
+        self._kwargs = {key: value for key, value in locals().items() if key != 'self'}
 
         self._timeout = timeout
         self._interrupted = None
@@ -595,20 +2047,52 @@ class Fuzzer:
 
         self.no_reset = no_reset
         self.hot_restart = hot_restart
+        self.fix_unread = fix_unread
         self.save_interesting = save_interesting
         self.hot_restart_threshold = hot_restart_threshold
         self.sample_type = sample_type
 
         self.write_xml_tests = write_xml_tests
+        self.trace_file = trace_file
+        if profile or trace_file is not None:
+            _profiler.enable(trace_file)
+        self.workers = workers
+        self._evaluator = None
+        self.islands = islands
+        # (index, updates, inbox) of the queues to the main fuzzer if this fuzzer is an island
+        self._island = None
+        self._island_published = 0
+        self._island_coverage = CoverageItemIds()
 
         self.seed = self.init_seed(seed)
         random.seed(self.seed)
 
-        self.encode = self._select_encode(sample_type)
-        self._program = Program(program_path, output_dir, log_dir, timeout, sample_type, coverage_type, self.seed, input_size)
+        self.encode, self.encode_population = self._select_encode(sample_type)
+        self._cache = EvaluationCache(cache_size, self.UNIT_SIZES[self.sample_type])
+        self._surrogate = None if surrogate_fraction is None else SurrogateFilter(surrogate_fraction)
+        self._program = Program(program_path, output_dir, log_dir, timeout, sample_type, coverage_type, self.seed, input_size, execution_engine, build_cache, final_coverage, scratch_dir, objective)
         self.cma_es = CMA_ES(self.seed, self._program.input_size, init_popsize, max_popsize, max_gens, popsize_scale, max_evaluations)
-        self._samplecollector = SampleCollector(save_interesting, self._program.cal_coverage_item_size())
-        self._logger = FuzzerLogger(strategy, live_logs).resister(self)
+        # without inputs nothing is fuzzed, check_no_early_stop stops before the coverage items are needed
+        self._samplecollector = SampleCollector(save_interesting, self._program.cal_coverage_item_size() if self._program.input_size != 0 else 0)
+        # the hit count buckets of each item as bits and the best closeness of each comparison, so far and before the current CMA-ES run
+        self._hit_frontier, self._cmp_frontier = {}, {}
+        self._run_hit_frontier, self._run_cmp_frontier = {}, {}
+        # the logs of a resumed campaign are appended to
+        resume = resume and os.path.isfile(self._checkpoint_path())
+        self._logger = FuzzerLogger(strategy, live_logs).resister(self, resume)
+        self._xml_tests_written = 0
+        if write_xml_tests:
+            self._write_xml_metadata()
+
+        # where the campaign is, so that a checkpoint taken in the middle of a CMA-ES run continues it
+        self._prev_optimized = False
+        self._hot_restarts = None
+        self._resumed = False
+        self._time_offset = 0
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.time()
+        if resume:
+            self.resume()
 
     def init_seed(self, seed):
         if seed is None:
@@ -618,10 +2102,10 @@ class Fuzzer:
     def _select_encode(self, sample_type):
         if sample_type == 'real':
             self.sample_type = 'real'
-            return self._encode_real
+            return self._encode_real, self._encode_real_population
         elif sample_type == 'bytes':
             self.sample_type = 'bytes'
-            return self._encode_bytes
+            return self._encode_bytes, self._encode_bytes_population
         exit('ERROR: Unknown sample type!')
 
     def _check_compile_error(self, returncode):
@@ -661,23 +2145,39 @@ class Fuzzer:
     def _encode_real(self, sample):
         if sample is None:
             return None
-        parse_to_feasible = lambda x: int(min(max(x * self.PARSING_SCALE, self.UNSIGNED_INT_MIN), self.UNSIGNED_INT_MAX))
-        out = bytearray()
-        for sample_comp in sample:
-            out += parse_to_feasible(sample_comp).to_bytes(4, 'little', signed = False)
-        return out
+        buffer, offsets = self._encode_real_population([sample])
+        return bytearray(buffer)
 
     @_timeit
     def _encode_bytes(self, sample):
         if sample is None:
             return None
+        buffer, offsets = self._encode_bytes_population([sample])
+        return bytearray(buffer)
+
+    # the inputs of a population are encoded into one buffer, input i is buffer[offsets[i]:offsets[i + 1]]
+    @_timeit
+    def _encode_real_population(self, samples):
+        values = np.clip(np.asarray(samples, dtype = float) * self.PARSING_SCALE, self.UNSIGNED_INT_MIN, self.UNSIGNED_INT_MAX)
+        return self._population_buffer(values.astype('<u4'))
 
+    @_timeit
+    def _encode_bytes_population(self, samples):
         lowerbound, upperbound = self.cma_es.get_bounds()
-        parse_to_feasible = lambda x: int(min(max(x, lowerbound), upperbound - 1))
-        out = bytearray(list(np.frompyfunc(parse_to_feasible, 1, 1)(sample)))
-        return out
+        values = np.clip(np.asarray(samples, dtype = float), lowerbound, upperbound - 1)
+        return self._population_buffer(values.astype(np.uint8))
 
-    # @_timeit
+    def _population_buffer(self, values):
+        # truncation towards zero in astype matches int() of the clipped values
+        row_size = values.itemsize * values.shape[1]
+        return values.tobytes(), np.arange(len(values) + 1) * row_size
+
+    def _population_inputs(self, samples):
+        buffer, offsets = self.encode_population(samples)
+        view = memoryview(buffer)
+        return [view[offsets[i]:offsets[i + 1]] for i in range(len(samples))]
+
+    @_timeit
     def _run_sample(self, sample, returncode_check = False):
         if sample is None:
             return
@@ -685,18 +2185,38 @@ class Fuzzer:
         if returncode_check:
             self._check_verifier_error(returncode)
 
-    def _xml_dump_sample(self, index, sample):
-        if sample is None:
+    def _write_xml_test(self, index, sample_holder):
+        if sample_holder.sample is None:
             return
 
-        lines = self._program.xml_dump(self.encode(sample))
+        input_bytes = self.encode(sample_holder.sample)
+        input_types = self._get_evaluation(sample_holder)[3]
+        lines = self._program.xml_inputs(input_bytes, input_types)
 
-        with open('{}/tests/{}.xml'.format(self._program.output_dir, index), 'wt+') as f:
+        # the test case only appears once it is complete, in case the fuzzer is killed while writing
+        path = '{}/tests/{}.xml'.format(self._program.output_dir, index)
+        with open(path + '.tmp', 'wt') as f:
             f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
             f.write('<!DOCTYPE testcase PUBLIC "+//IDN sosy-lab.org//DTD test-format testcase 1.1//EN" "https://sosy-lab.org/test-format/testcase-1.1.dtd">\n')
             f.write('<testcase>\n')
             f.write(lines)
             f.write('</testcase>\n')
+        os.replace(path + '.tmp', path)
+
+    def _get_evaluation(self, sample_holder):
+        if sample_holder.evaluation is None:
+            # the random sample was never run
+            sample_holder.evaluation = self._evaluate(self.encode(sample_holder.sample))
+        return sample_holder.evaluation
+
+    def _write_new_xml_tests(self):
+        # test cases are written as soon as they are added to the total samples
+        if not self.write_xml_tests or self.cma_es.input_size == 0:
+            return
+        sample_holders = self._samplecollector.total_sample_holders
+        while self._xml_tests_written < len(sample_holders):
+            self._write_xml_test(self._xml_tests_written, sample_holders[self._xml_tests_written])
+            self._xml_tests_written += 1
 
     def save_random_sample(self):
         lowerbound, upperbound = self.cma_es.get_bounds()
@@ -707,10 +2227,6 @@ class Fuzzer:
         for sample in samples:
             self._run_sample(sample, returncode_check)
     
-    def _xml_dump_samples(self, samples):
-        for index, sample in enumerate(samples):
-            self._xml_dump_sample(index, sample)
-
     def penalize(self, input_vector):
         penalty = 0
         minimum, upperbound = self.cma_es.get_bounds()
@@ -722,19 +2238,61 @@ class Fuzzer:
 
         return 1 - 1/(int(penalty) + 1)
 
+    def _evaluate(self, input_bytes):
+        evaluation = self._cache.get(input_bytes)
+        if evaluation is None:
+            evaluation = self._program.evaluate(input_bytes)
+            self._cache.put(input_bytes, evaluation)
+        return evaluation
+
     @_timeit
-    def objective(self, sample):
-        self._run_sample(sample)
-        coverage_item_ids = self._program.get_coverage_item_ids()
+    def objective(self, sample, evaluation = None, input_bytes = None):
+        # the covered items come first, the tie breaker below one item only orders the samples that cover as many
+        score, tie_breaker = self.score(sample, evaluation, input_bytes)
+        return -score - tie_breaker
+
+    def score(self, sample, evaluation = None, input_bytes = None):
+        # the number of covered items and the tie breaker of the objective
+        self._program.check_timeout()
+        if evaluation is None:
+            if input_bytes is None:
+                input_bytes = self.encode(sample)
+            evaluation = self._evaluate(input_bytes)
+            returncode, coverage_item_ids, input_size = evaluation[:3]
+        else:
+            evaluation = evaluation.result()
+            returncode, coverage_item_ids, input_size = evaluation[:3]
+            self._program.input_size = min(max(self._program.input_size, input_size), Program.MAX_INPUT_SIZE)
         # penalty = self.penalize(sample)
-        executed_coverage_item_ids = self._samplecollector.get_executed_coverage_item_ids(sample, coverage_item_ids)
-        
-        return -len(executed_coverage_item_ids)
+        tie_breaker = self.tie_breaker(*evaluation[5:7]) if len(evaluation) > 5 else 0
+        executed_coverage_item_ids = self._samplecollector.get_executed_coverage_item_ids(sample, coverage_item_ids, input_size, evaluation, tie_breaker)
+        self._write_new_xml_tests()
+
+        return len(executed_coverage_item_ids), tie_breaker
     
+    def tie_breaker(self, hit_buckets, closeness):
+        # below one covered item: how much closer the comparisons came than in the runs before the current CMA-ES run,
+        # then the items in a hit count bucket that no run before reached, like the new buckets of AFL.
+        # the closeness itself would lead every run to the same comparisons, also decided ones
+        new_buckets = 0
+        for item, bucket in hit_buckets.items():
+            new_buckets += not self._run_hit_frontier.get(item, 0) >> bucket & 1
+            self._hit_frontier[item] = self._hit_frontier.get(item, 0) | 1 << bucket
+        hits = new_buckets / (len(hit_buckets) + 1)
+        if closeness is None:
+            return hits
+        gain = 0
+        for offset, value in closeness.items():
+            gain += max(value - self._run_cmp_frontier.get(offset, 0), 0)
+            if value > self._cmp_frontier.get(offset, 0):
+                self._cmp_frontier[offset] = value
+        return (gain + hits) / (gain + hits + 1)
+
     def get_current_state(self):
         return dict(current_testcase = self._samplecollector.get_current_size(), total_testcase =  self._samplecollector.get_total_size(),
          current_coverage = round(self.get_current_coverage(), 4), total_coverage = round(self.get_total_coverage(), 4),
-         CMA_ES_seed = self.cma_es._options['seed'],popsize = self.cma_es._options['popsize'], generations = self.cma_es.result.iterations, evaluations = self.cma_es.evaluations)
+         CMA_ES_seed = self.cma_es._options['seed'],popsize = self.cma_es._options['popsize'], generations = 0 if self.cma_es.result is None else self.cma_es.result.iterations, evaluations = self.cma_es.evaluations,
+         cache_hits = self._cache.hits, cache_misses = self._cache.misses)
 
     def _stop(self):
         if self._interrupted is not None:
@@ -749,13 +2307,79 @@ class Fuzzer:
         return self._stop_reason
 
     def time(self):
-        return time.time() - _init_time
+        return time.time() - self._program._init_time + self._time_offset
+
+    def _checkpoint_path(self):
+        return self._program.log_dir + self._program.pname + '.checkpoint'
 
-    def check_optimized(self, sample, check):
+    def _checkpoint_key(self):
+        # the coverage item ids and samples of a checkpoint only mean the same for the same program and settings
+        with open(self._program.path, 'rb') as f:
+            source = hashlib.sha256(f.read()).hexdigest()
+        return (self.CHECKPOINT_VERSION, source, self.sample_type, self._program.coverage_type, self.save_interesting, self._program.objective)
+
+    @_timeit
+    def write_checkpoint(self):
+        state = dict(key = self._checkpoint_key(), time = self.time(), timeout = self._timeout, cache_stats = (self._cache.hits, self._cache.misses), random = random.getstate(), np_random = np.random.get_state(),
+            cma_es = self.cma_es.get_state(), samplecollector = self._samplecollector.get_state(), input_size = self._program.input_size,
+            prev_optimized = self._prev_optimized, hot_restarts = self._hot_restarts, surrogate = self._surrogate, statuses = self._statuses, xml_tests_written = self._xml_tests_written,
+            frontiers = (self._hit_frontier, self._cmp_frontier, self._run_hit_frontier, self._run_cmp_frontier))
+        data = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+        # the checkpoint is only replaced once it is complete, in case the fuzzer is killed while writing
+        path = self._checkpoint_path()
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self._last_checkpoint = time.time()
+
+    def remove_checkpoint(self):
+        if os.path.isfile(self._checkpoint_path()):
+            os.remove(self._checkpoint_path())
+
+    def maybe_write_checkpoint(self):
+        if self.checkpoint_interval > 0 and time.time() - self._last_checkpoint >= self.checkpoint_interval:
+            self.write_checkpoint()
+
+    def resume(self):
+        path = self._checkpoint_path()
+        if not os.path.isfile(path):
+            # nothing to resume yet, the campaign starts from the beginning
+            return False
+        with open(path, 'rb') as f:
+            state = _CheckpointUnpickler(io.BytesIO(zlib.decompress(f.read()))).load()
+        if state['key'] != self._checkpoint_key():
+            exit('ERROR: The checkpoint was written for another program or other settings!')
+
+        random.setstate(state['random'])
+        np.random.set_state(state['np_random'])
+        self.cma_es.set_state(state['cma_es'])
+        self._samplecollector.set_state(state['samplecollector'])
+        self._program.input_size = state['input_size']
+        self._prev_optimized = state['prev_optimized']
+        self._hot_restarts = state['hot_restarts']
+        if self._surrogate is not None and state['surrogate'] is not None:
+            self._surrogate = state['surrogate']
+        self._statuses = state['statuses']
+        self._xml_tests_written = state['xml_tests_written']
+        self._hit_frontier, self._cmp_frontier, self._run_hit_frontier, self._run_cmp_frontier = state['frontiers']
+        # the campaign keeps its timeout, the time spent before the checkpoint counts towards it
+        self._time_offset = state['time']
+        self._timeout = state['timeout']
+        if self._timeout is not None:
+            self._program._timeout = self._timeout - self._time_offset
+        self._cache.hits, self._cache.misses = state['cache_stats']
+        self._resumed = True
+        self._logger.report_changes('-', state = 'resumed')
+        return True
+
+    def check_optimized(self, sample, check, evaluation = None, input_bytes = None):
         try:
             prev_current_cov = self.get_current_coverage()
             prev_total_cov = self.get_total_coverage()
-            value = self.objective(sample)
+            value = self.objective(sample, evaluation, input_bytes)
         except (subprocess.TimeoutExpired,  KeyboardInterrupt) as e:
             raise e
         finally:
@@ -775,6 +2399,33 @@ class Fuzzer:
 
         return value
 
+    def evaluate_samples(self, samples, check):
+        inputs = self._population_inputs(samples)
+        if self._evaluator is None:
+            return [self.check_optimized(sample, check, input_bytes = input_bytes) for sample, input_bytes in zip(samples, inputs)]
+
+        # run the programs in parallel, but merge the results in the order of the samples
+        evaluations = []
+        submitted = []
+        for input_bytes in inputs:
+            cached = self._cache.get(input_bytes)
+            if cached is None:
+                evaluation = self._evaluator.submit(input_bytes)
+                submitted.append((input_bytes, evaluation))
+            else:
+                evaluation = concurrent.futures.Future()
+                evaluation.set_result(cached)
+            evaluations.append(evaluation)
+        try:
+            return [self.check_optimized(sample, check, evaluation) for sample, evaluation in zip(samples, evaluations)]
+        finally:
+            for evaluation in evaluations:
+                evaluation.cancel()
+            concurrent.futures.wait(evaluations)
+            for input_bytes, evaluation in submitted:
+                if not evaluation.cancelled() and evaluation.exception() is None:
+                    self._cache.put(input_bytes, evaluation.result())
+
     @_timeit
     def sample_until_interesting_found(self, number, score, check):
         es = self.cma_es
@@ -784,20 +2435,36 @@ class Fuzzer:
         while len(samples) <= number and score >= self._samplecollector.best_sample_holder.score and not es.stop():
             extra_samples = es.ask()
             samples += extra_samples
-            values += [self.check_optimized(sample, check) for sample in extra_samples]
+            values += self.evaluate_samples(extra_samples, check)
 
         return samples, values
 
     @_timeit
     def optimize_sample(self, number = 0, score = 0, mean = None, sigma = None, sigmas = None, fixed_variables = None, check = True):
-        es = self.cma_es.init_cmaes(mean, sigma, sigmas, fixed_variables)
+        if self._resumed:
+            # the strategy of the checkpoint continues with its next generation
+            self._resumed = False
+            es = self.cma_es
+        else:
+            if self._island is not None:
+                self._sync_island()
+            if self._surrogate is not None:
+                self._surrogate.reset()
+            self._run_hit_frontier, self._run_cmp_frontier = dict(self._hit_frontier), dict(self._cmp_frontier)
+            es = self.cma_es.init_cmaes(mean, sigma, sigmas, fixed_variables)
         while not es.stop():
             try:
                 samples = es.ask()
-                values = [self.check_optimized(sample, check) for sample in samples]
+                if self._surrogate is None:
+                    values = self.evaluate_samples(samples, check)
+                else:
+                    executed, predictions = self._surrogate.select(samples)
+                    values = self.evaluate_samples([samples[i] for i in executed], check)
+                    values = self._surrogate.tell(samples, executed, values, predictions)
                 # extra_samples, extra_values = self.sample_until_interesting_found(number, score, check = check)
                 es.tell(samples, values)
                 es.update(self._program.input_size)
+                self.maybe_write_checkpoint()
 
                 # print('----------------------------------')
                 # print('iter:\n', es.result.iterations)
@@ -812,7 +2479,9 @@ class Fuzzer:
                 self._interrupted = e
                 break
 
-        return self._samplecollector.add_best(es.result.xbest, es.result.stds)
+        optimized = self._samplecollector.add_best(es.result.xbest, es.result.stds)
+        self._write_new_xml_tests()
+        return optimized
     
     def extract_mean_sigmas_for_hot_restart(self, sample_holder):
         mean = []
@@ -832,48 +2501,164 @@ class Fuzzer:
             else:
                 mean.append(sample_holder.sample[i])
 
-        return mean, sigmas
-
-    @_timeit
-    def optimize_samples_with_hot_restart(self):
-        number_of_hot_restarts = len(self._samplecollector.optimized_sample_holders)
-        pre_cov = self.get_current_coverage()
-        max_cov = pre_cov
-        optimized = False
-        while number_of_hot_restarts > 0 and not self._stop():
-            if not optimized:
-                mean, sigmas = self.extract_mean_sigmas_for_hot_restart(self._samplecollector.pop_first_optimum_holder())
+        # the dimensions after the input read by the sample do not change its coverage
+        fixed_variables = None
+        if self.fix_unread and 0 < sample_holder.input_size < len(mean):
+            fixed_variables = {i: mean[i] for i in range(sample_holder.input_size, len(mean))}
 
-            optimized = self.optimize_sample(mean = mean, sigmas = sigmas, check = False)
-            # optimized = self.optimize_sample(mean = mean, sigmas = sigmas, number=1000, score=self.get_total_coverage())
-            self._logger.report_changes(optimized, state = 'hot_restart')
+        return mean, sigmas, fixed_variables
 
-            # count the number down only if not optimized, otherwise try to optimize with the previous mean and sigmas
-            if not optimized:
-                number_of_hot_restarts -= 1
+    def _init_hot_restarts(self):
+        coverage = self.get_current_coverage()
+        return dict(number = len(self._samplecollector.optimized_sample_holders), pre_cov = coverage, max_cov = coverage, mean = None, sigmas = None, fixed_variables = None)
 
-            max_cov = max(max_cov, self.get_current_coverage())
-
-        if pre_cov < max_cov:
-            self.optimize_samples_with_hot_restart()
+    @_timeit
+    def optimize_samples_with_hot_restart(self):
+        # the hot restarts are repeated as long as they increase the coverage, their state is kept for checkpoints
+        if self._hot_restarts is None:
+            self._hot_restarts = self._init_hot_restarts()
+        while True:
+            state = self._hot_restarts
+            while state['number'] > 0 and not self._stop():
+                if state['mean'] is None:
+                    state['mean'], state['sigmas'], state['fixed_variables'] = self.extract_mean_sigmas_for_hot_restart(self._samplecollector.pop_first_optimum_holder())
+
+                optimized = self.optimize_sample(mean = state['mean'], sigmas = state['sigmas'], fixed_variables = state['fixed_variables'], check = False)
+                # optimized = self.optimize_sample(mean = mean, sigmas = sigmas, number=1000, score=self.get_total_coverage())
+                self._logger.report_changes(optimized, state = 'hot_restart')
+
+                # count the number down only if not optimized, otherwise try to optimize with the previous mean and sigmas
+                if not optimized:
+                    state['number'] -= 1
+                    state['mean'] = None
+
+                state['max_cov'] = max(state['max_cov'], self.get_current_coverage())
+
+            if state['pre_cov'] >= state['max_cov']:
+                break
+            self._hot_restarts = self._init_hot_restarts()
+        self._hot_restarts = None
 
     # @_timeit
     def optimize_samples(self):
-        optimized = False
         while not self._stop():
-            # optimized = self.optimize_sample(number = 1000, score = self.get_current_coverage())
-            # optimized = self.optimize_sample(number = 1000, score = self.get_total_coverage())
-            prev_optimized = optimized
-            optimized = self.optimize_sample()
-            self._logger.report_changes(optimized, state = 'done')
-
-            if not optimized:
+            if self._hot_restarts is None:
+                # optimized = self.optimize_sample(number = 1000, score = self.get_current_coverage())
+                # optimized = self.optimize_sample(number = 1000, score = self.get_total_coverage())
+                optimized = self.optimize_sample()
+                self._logger.report_changes(optimized, state = 'done')
+                prev_optimized, self._prev_optimized = self._prev_optimized, optimized
+                if optimized:
+                    continue
                 if self.hot_restart and prev_optimized:
                     self.optimize_samples_with_hot_restart()
-                if not self.cma_es._increase_popsize():
-                    self.cma_es._reset_popsize()
-                if not self.no_reset:
-                    self._reset()
+            else:
+                # resumed in the middle of the hot restarts
+                self.optimize_samples_with_hot_restart()
+
+            if not self.cma_es._increase_popsize():
+                self.cma_es._reset_popsize()
+            if not self.no_reset:
+                self._reset()
+
+    def _island_kwargs(self, index):
+        # the islands start at different population sizes of the IPOP schedule, each one with its own seed
+        init_popsize, popsize_scale = self._kwargs['init_popsize'], self._kwargs['popsize_scale']
+        levels = 1
+        while init_popsize * popsize_scale ** levels <= self._kwargs['max_popsize']:
+            levels += 1
+        max_evaluations = self._kwargs['max_evaluations']
+        if max_evaluations != np.inf:
+            max_evaluations = -(-max_evaluations // self.islands)
+        # the islands count their time from their start, they stop at the timeout of this fuzzer
+        timeout = self._timeout
+        if timeout is not None:
+            timeout -= self.time()
+
+        return dict(self._kwargs, islands = 1, seed = self.seed + index, init_popsize = init_popsize * popsize_scale ** (index % levels),
+            max_evaluations = max_evaluations, timeout = timeout, write_xml_tests = False, trace_file = None, scratch_dir = self._program.gcda_dir,
+            output_dir = '%sisland_%d/' % (self._program.output_dir, index), log_dir = '%sisland_%d/' % (self._program.log_dir, index))
+
+    def publish_island(self, stop_reason = None):
+        index, updates, inbox = self._island
+        holders = self._samplecollector.total_sample_holders[self._island_published:]
+        self._island_published += len(holders)
+        updates.put((index, holders, self.cma_es.evaluations, stop_reason))
+
+    def _sync_island(self):
+        # the test cases since the last CMA-ES run go to the main fuzzer, and the coverage item ids of all islands
+        # count as optimized, so that this run goes after the ones that no island has covered yet
+        self.publish_island()
+        inbox = self._island[2]
+        while True:
+            try:
+                self._island_coverage = CoverageItemIds(inbox.get_nowait())
+            except queue.Empty:
+                break
+        self._samplecollector.optimized_coverage_item_ids.update(self._island_coverage)
+        if len(self._island_coverage) >= self._samplecollector.coverage_item_size:
+            raise StopIteration(self.FULL_COVERAGE)
+
+    def _merge_island(self, holders):
+        collector = self._samplecollector
+        pre_score = len(collector.total_coverage_item_ids)
+        for holder in holders:
+            if len(collector.total_sample_holders) == 0:
+                collector.total_coverage_item_ids.update(holder.coverage_item_ids)
+                collector.total_sample_holders.append(holder)
+            else:
+                collector.check_interesting(holder.sample, holder.coverage_item_ids, holder.evaluation)
+        collector.total_score = len(collector.total_coverage_item_ids)
+        return pre_score < collector.total_score
+
+    def optimize_islands(self):
+        # every island is a fuzzer in its own process. the test cases they find are merged here and the coverage
+        # item ids of all islands are sent back to them
+        updates = multiprocessing.Queue()
+        islands = []
+        for index in range(self.islands):
+            inbox = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_run_island, args=(self._island_kwargs(index), index, updates, inbox))
+            process.start()
+            islands.append(dict(process = process, inbox = inbox, evaluations = 0, stop_reason = None))
+
+        try:
+            while any(island['stop_reason'] is None for island in islands):
+                try:
+                    index, holders, evaluations, stop_reason = updates.get(timeout=1)
+                except queue.Empty:
+                    for island in islands:
+                        if island['stop_reason'] is None and not island['process'].is_alive():
+                            island['stop_reason'] = 'island exit code %s' % island['process'].exitcode
+                    if self._timeout is not None and self.time() > self._timeout + self.ISLAND_GRACE:
+                        break
+                    continue
+                except KeyboardInterrupt as e:
+                    # the islands are stopped as well and still send the test cases they found
+                    self._interrupted = e
+                    for island in islands:
+                        if island['process'].is_alive():
+                            os.kill(island['process'].pid, signal.SIGINT)
+                    continue
+
+                islands[index].update(evaluations = evaluations, stop_reason = stop_reason)
+                self.cma_es.evaluations = sum(island['evaluations'] for island in islands)
+                if self._merge_island(holders):
+                    for island in islands:
+                        if island['stop_reason'] is None:
+                            island['inbox'].put(self._samplecollector.total_coverage_item_ids.bits)
+                    self._write_new_xml_tests()
+                    self._logger.report_changes(True, state = 'island_%d' % index)
+        finally:
+            for island in islands:
+                island['process'].join(timeout=self.ISLAND_GRACE if island['stop_reason'] is None else None)
+                if island['process'].is_alive():
+                    island['process'].terminate()
+                    island['process'].join()
+                island['inbox'].cancel_join_thread()
+
+        self._stop_reason = ', '.join(sorted(set(island['stop_reason'] for island in islands if island['stop_reason'] is not None)))
+        self._stop()
 
     def check_no_early_stop(self):
         if self.cma_es.input_size == 0:
@@ -882,6 +2667,7 @@ class Fuzzer:
 
         if self._samplecollector.coverage_item_size == 0:
             self.save_random_sample()
+            self._write_new_xml_tests()
             self._stop_reason = self.NO_INTERESTING_BRANCHES
             return False
 
@@ -891,33 +2677,64 @@ class Fuzzer:
         try:
             self._program._compile_program()
             if self.check_no_early_stop():
-                self.optimize_samples()
+                if self.islands > 1:
+                    self.optimize_islands()
+                else:
+                    if self.workers > 1:
+                        self._evaluator = EvalParallel(self._program, self.workers)
+                    self.optimize_samples()
         except (subprocess.TimeoutExpired,  KeyboardInterrupt, StopIteration) as e:
             self._interrupted = e
         finally:
+            if self._evaluator is not None:
+                self._evaluator.close()
+                self._evaluator = None
             self._program.delete_gcda()
             self._program._timeout = None
+        if not isinstance(self._interrupted, KeyboardInterrupt):
+            # the campaign came to its end, a later --resume starts a new one
+            self.remove_checkpoint()
 
         return self.parse_total_samples_to_input_vectors()
 
     def parse_total_samples_to_input_vectors(self):
         return [self.encode(sample) for sample in self.get_total_samples()]            
 
-    def last_report(self):
-        self._program._compile_program()
+    def _rerun_coverages(self, samples, returncode_check = False):
+        self._program._compile_program(report = True)
 
-        total_samples = self.get_total_samples()
         if self.cma_es.input_size == 0:
             self._program._run(None)
         else:
-            self._run_samples(total_samples, returncode_check=True)
-        
-        line, branch = self._program.get_line_and_branch_coverages()
+            self._run_samples(samples, returncode_check)
+
+        return self._program.get_line_and_branch_coverages()
+
+    def _accumulated_coverages(self):
+        evaluations = [self._get_evaluation(holder) for holder in self._samplecollector.total_sample_holders if holder.sample is not None]
+        for evaluation in evaluations:
+            self._check_verifier_error(evaluation[0])
+        return self._program.get_accumulated_coverages([evaluation[4] for evaluation in evaluations])
+
+    def last_report(self):
+        total_samples = self.get_total_samples()
+        if self._program.final_coverage == 'rerun' or self.cma_es.input_size == 0:
+            line, branch = self._rerun_coverages(total_samples, returncode_check=True)
+        else:
+            line, branch = self._accumulated_coverages()
+            if self._program.final_coverage == 'checked':
+                checked_line, checked_branch = self._rerun_coverages(total_samples)
+                if (checked_line, checked_branch) != (line, branch):
+                    print('WARNING: accumulated coverage (%s, %s) differs from gcov (%s, %s)' % (line, branch, checked_line, checked_branch), file=sys.stderr)
+
+        self._program.stop_engine()
 
         self._logger.report_final()
         self._logger.report_time_log()
         self._logger.print_logs()
         self._logger.write_csv()
+        if self.trace_file is not None:
+            _profiler.close_trace()
 
         print('total sample len:', len(total_samples))
         print('total samples:', total_samples)
@@ -926,12 +2743,10 @@ class Fuzzer:
         print('branch_coverage:', round(0.01 * branch, 4))
         print('total_eval:', self.cma_es.evaluations)
         print('seed:', self.seed)
+        return round(0.01 * line, 4), round(0.01 * branch, 4)
 
-    def maybe_write_xml_tests(self):
-        if not self.write_xml_tests:
-            return
-
-        os.system("mkdir -p {}/tests".format(self._program.output_dir))
+    def _write_xml_metadata(self):
+        os.makedirs(self._program.output_dir + 'tests', exist_ok=True)
         with open("{}/tests/metadata.xml".format(self._program.output_dir), "wt+") as md:
             md.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
             md.write('<!DOCTYPE test-metadata PUBLIC "+//IDN sosy-lab.org//DTD test-format test-metadata 1.1//EN" "https://sosy-lab.org/test-format/test-metadata-1.1.dtd">\n')
@@ -949,11 +2764,28 @@ class Fuzzer:
             md.write('<creationtime>{}</creationtime>\n'.format(datetime.datetime.now()))
             md.write('</test-metadata>\n')
 
-        self._program._compile_xml_dump()
+    def maybe_write_xml_tests(self):
+        if not self.write_xml_tests:
+            return
 
-        total_samples = self.get_total_samples()
-        if self.cma_es.input_size != 0:
-            self._xml_dump_samples(total_samples)
+        self._write_new_xml_tests()
+        self._program.stop_engine()
+
+    def close(self):
+        self._program.close()
+        self._logger.close()
+        if self.trace_file is not None:
+            _profiler.close_trace()
+
+def _run_island(kwargs, index, updates, inbox):
+    # the process of an island, see Fuzzer.optimize_islands
+    island = Fuzzer(**kwargs)
+    island._island = index, updates, inbox
+    try:
+        island.generate_testsuite()
+    finally:
+        island.publish_island(island._stop() or 'stopped')
+        island.close()
 
 def parse_argv_to_fuzzer_kwargs():
     arg_parser = argparse.ArgumentParser()
@@ -963,6 +2795,10 @@ def parse_argv_to_fuzzer_kwargs():
         help = 'directory for complied and executable programs')
     arg_parser.add_argument('-ld', '--log_dir', type = str, default =Program.DEFAULT_DIRS['log'],
         help = 'directory for logs')
+    arg_parser.add_argument('-bc', '--build_cache', type = str, default =Program.DEFAULT_DIRS['build_cache'],
+        help = 'directory for compiled programs that are reused across runs')
+    arg_parser.add_argument('-sd', '--scratch_dir', type = str,
+        help = 'directory in which a private directory for the .gcda files of the runs is made, default is /dev/shm')
     arg_parser.add_argument('-ip', '--init_popsize', type = int, default = CMA_ES.DEFAULTS['init_popsize'],
         help = 'initial population size for CMA-ES to start with')
     arg_parser.add_argument('-mp', '--max_popsize', type = int, default = CMA_ES.DEFAULTS['max_popsize'],
@@ -976,19 +2812,43 @@ def parse_argv_to_fuzzer_kwargs():
     arg_parser.add_argument('-t', '--timeout', type = int, default = Fuzzer.DEFAULTS['timeout'],
         help = 'timeout in seconds')
     arg_parser.add_argument('-ct', '--coverage_type', type = str, default = Program.DEFAULTS['coverage_type'],
-        help = 'type of coverage for obejctive function for CMA-ES-Fuzzer')
+        help = 'type of coverage for obejctive function for CMA-ES-Fuzzer: line, branch, native_line, native_branch, map_line or map_branch')
+    arg_parser.add_argument('-ee', '--execution_engine', type = str, default = Program.DEFAULTS['execution_engine'],
+        help = 'how the program is executed for each sample: subprocess, fork_server or persistent')
+    arg_parser.add_argument('-o', '--objective', type = str, default = Program.DEFAULTS['objective'],
+        help = 'objective of CMA-ES: coverage, hit_count that breaks ties of the covered items by new hit count buckets, or cmp_distance that breaks them by comparison distances and then hit counts')
+    arg_parser.add_argument('-fc', '--final_coverage', type = str, default = Program.DEFAULTS['final_coverage'],
+        help = 'how the final line and branch coverage is computed: rerun the samples with gcov, accumulated from the fuzzing runs, or checked against gcov')
+    arg_parser.add_argument('-w', '--workers', type = int, default = Fuzzer.DEFAULTS['workers'],
+        help = 'number of samples of a population that are evaluated in parallel')
+    arg_parser.add_argument('-cs', '--cache_size', type = int, default = Fuzzer.DEFAULTS['cache_size'],
+        help = 'number of executed inputs whose coverage is remembered, 0 deactivates the cache')
+    arg_parser.add_argument('-i', '--islands', type = int, default = Fuzzer.DEFAULTS['islands'],
+        help = 'number of CMA-ES fuzzers that run in parallel processes and share their coverage')
+    arg_parser.add_argument('-sf', '--surrogate_fraction', type = float, default = Fuzzer.DEFAULTS['surrogate_fraction'],
+        help = 'fraction of each population that is executed after a model of the objective ranked it, off by default')
+    arg_parser.add_argument('-rs', '--resume', action = 'store_true',
+        help = 'continue the campaign from the checkpoint in the log directory, if there is one')
+    arg_parser.add_argument('-ci', '--checkpoint_interval', type = int, default = Fuzzer.DEFAULTS['checkpoint_interval'],
+        help = 'seconds between the checkpoints written to the log directory, 0 deactivates them')
     arg_parser.add_argument('-hrt', '--hot_restart_threshold', type = int, default = Fuzzer.DEFAULTS['hot_restart_threshold'],
         help = 'threshold for the optimized sigma vector to decide whether their components, among mean vector components, are reset to default for the hot restart.')
     arg_parser.add_argument('-nr', '--no_reset', action = 'store_true',
         help = 'deactivate reset after not optimized (only for testing)')
     arg_parser.add_argument('-hr', '--hot_restart', action = 'store_true',
         help = 'activate hot restart while optimizing samples')
+    arg_parser.add_argument('-fu', '--fix_unread', action = 'store_true',
+        help = 'fix the dimensions that the restarted sample did not read for hot restarts')
     arg_parser.add_argument('-si', '--save_interesting', action = 'store_true',
         help = 'save interesting coverage item ids while optimizing')
     arg_parser.add_argument('-is', '--input_size', type = int,
         help = 'fixed input size for CMA-ES')
     arg_parser.add_argument('--strategy', type = str,
         help = 'strategy label for log and csv')
+    arg_parser.add_argument('-pr', '--profile', action = 'store_true',
+        help = 'record each call of the timed methods for percentiles and cpu time in the logs')
+    arg_parser.add_argument('-tf', '--trace_file', type = str,
+        help = 'write a chrome trace of the timed methods to this file, implies --profile')
     arg_parser.add_argument('-ll', '--live_logs', action = 'store_true',
         help = 'write logs as txt file in log files whenever it changes')
     arg_parser.add_argument('program_path', nargs = '*' ,type = str,
@@ -1010,9 +2870,12 @@ def parse_argv_to_fuzzer_kwargs():
 def main():
     kwargs = parse_argv_to_fuzzer_kwargs()
     fuzzer = Fuzzer(**kwargs)
-    t = fuzzer.generate_testsuite()
-    fuzzer.last_report()
-    fuzzer.maybe_write_xml_tests()
+    try:
+        t = fuzzer.generate_testsuite()
+        fuzzer.last_report()
+        fuzzer.maybe_write_xml_tests()
+    finally:
+        fuzzer.close()
 
 if __name__ == "__main__":
     main()
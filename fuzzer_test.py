@@ -1,3 +1,4 @@
+import os
 import numpy as np
 import fuzzer
 
@@ -14,6 +15,17 @@ def assert_gcov_coverage_matches_calculated_coverage(gcov_cov, calculated_cov):
     if gcov_cov != calculated_cov:
         exit('Test Failed: gcov coverage (%f) does not match with calculated coverage (%f)' % (gcov_cov, calculated_cov))
 
+def assert_tie_breaker_is_below_one_item(score, tie_breaker):
+    # a sample that covers one more item has to rank higher, whatever its tie breaker
+    if not 0 <= tie_breaker < 1 or -score - tie_breaker <= -(score + 1):
+        exit('Test Failed: tie breaker (%f) outweighs a covered item' % tie_breaker)
+
+def assert_no_gcov_files_are_written(gcov_files):
+    # the coverage summaries are read from the output of gcov, the annotated sources are not needed
+    written = set(f for f in os.listdir('.') if f.endswith('.gcov')) - gcov_files
+    if written:
+        exit('Test Failed: gcov wrote %s into the working directory' % sorted(written))
+
 def assert_no_duplicates(sample_holders):
     # return
     for i, sample_holder1 in enumerate(sample_holders):
@@ -32,8 +44,8 @@ class TestSampleCollector(fuzzer.SampleCollector):
         super(TestSampleCollector, self).__init__(save_interesting, coverage_item_size)
         self.fuzzer = fuzzer
 
-    def check_interesting(self, sample, current_coverage_item_id):
-        super(TestSampleCollector, self).check_interesting(sample, current_coverage_item_id)
+    def check_interesting(self, sample, current_coverage_item_id, evaluation = None):
+        super(TestSampleCollector, self).check_interesting(sample, current_coverage_item_id, evaluation)
         assert_no_duplicates(self.total_sample_holders)
 
     def add_best(self, sample, stds):
@@ -44,32 +56,43 @@ class TestSampleCollector(fuzzer.SampleCollector):
 class TestFuzzer(fuzzer.Fuzzer):
     def __init__(self, **kwargs):
         super(TestFuzzer, self).__init__(**kwargs)
-        self._samplecollector = TestSampleCollector(self, save_interesting=kwargs['save_interesting'], coverage_item_size = self._samplecollector.coverage_item_size)
+        samplecollector = TestSampleCollector(self, save_interesting=kwargs['save_interesting'], coverage_item_size = self._samplecollector.coverage_item_size)
+        # a resumed campaign continues with the samples of its checkpoint
+        samplecollector.set_state(self._samplecollector.get_state())
+        self._samplecollector = samplecollector
 
     def get_gcov_coverages(self, sample):
         samples = self._samplecollector.get_optimized_samples()
-        self._run_samples(samples + [sample])
-        line_cov, branch_cov = self._program.get_line_and_branch_coverages()
+        if self._program.map_coverage:
+            # the map build writes no .gcda files, the samples are run again by the program of the coverage build
+            line_cov, branch_cov = self._rerun_coverages(samples + [sample])
+            self._program._compile_program()
+        else:
+            self._run_samples(samples + [sample])
+            line_cov, branch_cov = self._program.get_line_and_branch_coverages()
         if self._program.coverage_type == 'line':
             return line_cov
         return branch_cov
 
-    def objective(self, sample):
-        value = super(TestFuzzer, self).objective(sample)
-        calculated_cov = -round(100 * value/ self._samplecollector.coverage_item_size, fuzzer.Program.COV_DIGITS)
+    def score(self, sample, evaluation = None, input_bytes = None):
+        score, tie_breaker = super(TestFuzzer, self).score(sample, evaluation, input_bytes)
+        calculated_cov = round(100 * score / self._samplecollector.coverage_item_size, fuzzer.Program.COV_DIGITS)
         gcov_cov = self.get_gcov_coverages(sample)
 
         assert_gcov_coverage_matches_calculated_coverage(gcov_cov, calculated_cov)
+        assert_tie_breaker_is_below_one_item(score, tie_breaker)
 
-        return value
+        return score, tie_breaker
 
 
 def test():
+    gcov_files = set(f for f in os.listdir('.') if f.endswith('.gcov'))
     test_fuzzer = TestFuzzer(**kwargs)
     t = test_fuzzer.generate_testsuite()
     # print('interesting:', [s.sample for s in test_fuzzer._samplecollector.interesting_sample_holders])
     # print('interesting:', 100 * len(test_fuzzer._samplecollector.interesting_coverage_item_ids) / test_fuzzer._samplecollector._total_coverage_item_size)
     test_fuzzer.last_report()
+    assert_no_gcov_files_are_written(gcov_files)
 
     if test_fuzzer._interrupted is not None and test_fuzzer._interrupted.__class__ != StopIteration:
         print("Test interrupted with '%s'" % test_fuzzer._interrupted.__class__.__name__)
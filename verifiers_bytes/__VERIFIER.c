@@ -1,6 +1,12 @@
 #include <stdlib.h>
 #include <unistd.h>
 #include <stdio.h>
+#include <string.h>
+#include <fcntl.h>
+#include <setjmp.h>
+#include <sys/mman.h>
+#include <sys/types.h>
+#include <sys/wait.h>
 // #include <assert.h>
 
 
@@ -12,25 +18,319 @@ static int MAX_INPUT_SIZE = 1000;
 
 static int input_size;
 
+/* the type of every nondet call is recorded and printed as t<types> before the input size,
+   the fuzzer writes the test case from it without running the program again */
+static char *input_types;
+static size_t input_types_size, input_types_capacity;
+
+/* coverage map: the program is compiled with --coverage, the harness with -D__VERIFIER_GCOV_MAP
+   and they are linked with -Wl,--wrap=__gcov_init. the fuzzer passes a shared map as
+   __VERIFIER_COVERAGE_MAP="<path>,<size>" and the arc counters of the program are written into it
+   in the format of a .gcda file, instead of into a .gcda file. */
+extern char __executable_start;
+static unsigned char *coverage_map;
+static unsigned long coverage_map_size, coverage_map_pos;
+
+static unsigned char *_map_shared(const char *name, unsigned long *size) {
+    char *map = getenv(name);
+    char path[4096];
+    void *p;
+    int fd;
+
+    if (map == NULL || sscanf(map, "%4095[^,],%lu", path, size) != 2) {
+        return NULL;
+    }
+    fd = open(path, O_RDWR);
+    if (fd < 0) {
+        return NULL;
+    }
+    p = mmap(NULL, *size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    close(fd);
+    return p == MAP_FAILED ? NULL : p;
+}
+
+/* comparison distances: with -fsanitize-coverage=trace-cmp each comparison of the program calls
+   __sanitizer_cov_trace_*cmp* and the fuzzer passes a second shared map of 8 byte counters as
+   __VERIFIER_CMP_MAP. each comparison keeps the smallest distance of its operands in the run at
+   its offset, stored as its complement so that 0 stays for comparisons that were not executed. */
+static unsigned long *cmp_map;
+static unsigned long cmp_map_size;
+
+__attribute__((constructor(101))) static void _map_coverage() {
+    coverage_map = _map_shared("__VERIFIER_COVERAGE_MAP", &coverage_map_size);
+    cmp_map = (unsigned long *) _map_shared("__VERIFIER_CMP_MAP", &cmp_map_size);
+    cmp_map_size /= sizeof(*cmp_map);
+}
+
+#ifdef __VERIFIER_GCOV_MAP
+struct gcov_info;
+extern void __gcov_info_to_gcda(const struct gcov_info *info, void (*filename_fn)(const char *, void *),
+    void (*dump_fn)(const void *, unsigned, void *), void *(*allocate_fn)(unsigned, void *), void *arg);
+extern void __real___gcov_init(struct gcov_info *info);
+static struct gcov_info *gcov_info;
+
+/* the counters are only registered with libgcov in the persistent mode, which resets them after each input */
+void __wrap___gcov_init(struct gcov_info *info) {
+    gcov_info = info;
+    if (getenv("__VERIFIER_PERSISTENT") != NULL) {
+        __real___gcov_init(info);
+    }
+}
+
+static void _map_filename(const char *filename, void *arg) {
+}
+
+/* the fuzzer sizes the map for the counters of the program, nothing is written past it */
+static void _map_write(const void *data, unsigned n, void *arg) {
+    if (coverage_map_pos + n <= coverage_map_size) {
+        memcpy(coverage_map + coverage_map_pos, data, n);
+    }
+    coverage_map_pos += n;
+}
+
+static void *_map_allocate(unsigned n, void *arg) {
+    return malloc(n);
+}
+
+static void _dump_coverage_map() {
+    if (coverage_map == NULL || gcov_info == NULL) {
+        return;
+    }
+    coverage_map_pos = 0;
+    __gcov_info_to_gcda(gcov_info, _map_filename, _map_write, _map_allocate, NULL);
+}
+#endif
+
+static void _trace_distance(unsigned long distance, unsigned long pc) {
+    unsigned long offset;
+    if (cmp_map == NULL) {
+        return;
+    }
+    offset = pc - (unsigned long) &__executable_start;
+    if (offset < cmp_map_size && ~distance > cmp_map[offset]) {
+        cmp_map[offset] = ~distance;
+    }
+}
+
+/* the distance of integers is the sum of the distances of their bytes, so that each byte of the
+   input can come closer on its own, without carries from one byte to the next */
+static void _trace_cmp(unsigned long a, unsigned long b, unsigned long mask, unsigned long pc) {
+    unsigned long distance = 0, x, y;
+    for (; mask != 0; mask >>= 8, a >>= 8, b >>= 8) {
+        x = a & 0xff;
+        y = b & 0xff;
+        distance += x > y ? x - y : y - x;
+    }
+    _trace_distance(distance, pc);
+}
+
+static void _trace_cmp_real(double a, double b, unsigned long pc) {
+    double d = a > b ? a - b : b - a;
+    unsigned long distance = d == d && d < 1.8e19 ? (unsigned long) d : ~0UL;
+    _trace_distance(distance == 0 && d != 0 ? 1 : distance, pc);
+}
+
+void __sanitizer_cov_trace_cmp1(unsigned char a, unsigned char b) {
+    _trace_cmp(a, b, 0xff, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_cmp2(unsigned short a, unsigned short b) {
+    _trace_cmp(a, b, 0xffff, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_cmp4(unsigned int a, unsigned int b) {
+    _trace_cmp(a, b, 0xffffffffUL, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_cmp8(unsigned long a, unsigned long b) {
+    _trace_cmp(a, b, ~0UL, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_const_cmp1(unsigned char a, unsigned char b) {
+    _trace_cmp(a, b, 0xff, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_const_cmp2(unsigned short a, unsigned short b) {
+    _trace_cmp(a, b, 0xffff, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_const_cmp4(unsigned int a, unsigned int b) {
+    _trace_cmp(a, b, 0xffffffffUL, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_const_cmp8(unsigned long a, unsigned long b) {
+    _trace_cmp(a, b, ~0UL, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_cmpf(float a, float b) {
+    _trace_cmp_real(a, b, (unsigned long) __builtin_return_address(0));
+}
+
+void __sanitizer_cov_trace_cmpd(double a, double b) {
+    _trace_cmp_real(a, b, (unsigned long) __builtin_return_address(0));
+}
+
+/* cases[0] is the number of cases, cases[1] the width of the value in bits, the cases follow */
+void __sanitizer_cov_trace_switch(unsigned long value, unsigned long *cases) {
+    unsigned long mask = cases[1] >= 64 ? ~0UL : (1UL << cases[1]) - 1;
+    unsigned long i;
+    for (i = 0; i < cases[0]; i++) {
+        _trace_cmp(value, cases[i + 2], mask, (unsigned long) __builtin_return_address(0));
+    }
+}
+
+/* fork server: started by the fuzzer with __VERIFIER_FORKSERVER="<control fd>,<status fd>",
+   the process stops here before main and forks one child per request on the control fd.
+   the child continues to main, the parent reports its pid and wait status on the status fd. */
+__attribute__((constructor)) static void _fork_server() {
+    char *fds = getenv("__VERIFIER_FORKSERVER");
+    int control_fd, status_fd, request, status = 0;
+    pid_t pid;
+
+    if (fds == NULL || sscanf(fds, "%d,%d", &control_fd, &status_fd) != 2) {
+        return;
+    }
+    if (write(status_fd, &status, sizeof(status)) != sizeof(status)) {
+        return;
+    }
+    while (read(control_fd, &request, sizeof(request)) == sizeof(request)) {
+        pid = fork();
+        if (pid < 0) {
+            _exit(1);
+        }
+        if (pid == 0) {
+            close(control_fd);
+            close(status_fd);
+            return;
+        }
+        if (write(status_fd, &pid, sizeof(pid)) != sizeof(pid) || waitpid(pid, &status, 0) < 0) {
+            _exit(1);
+        }
+        if (write(status_fd, &status, sizeof(status)) != sizeof(status)) {
+            _exit(1);
+        }
+    }
+    _exit(0);
+}
+
+/* persistent mode: started with __VERIFIER_PERSISTENT="<control fd>,<status fd>", the process calls
+   main for each request on the control fd and answers like the fork server with its own pid.
+   __VERIFIER_error and __VERIFIER_assume jump back into the loop, the coverage counters are dumped
+   and reset after each input (compiled with -D__VERIFIER_GCOV or -D__VERIFIER_GCOV_MAP). any other
+   exit or crash ends the process, the fuzzer then runs the input again in a fresh process. */
+extern int main(int argc, char **argv, char **envp);
+#ifdef __VERIFIER_GCOV
+extern void __gcov_dump(void);
+#endif
+#if defined(__VERIFIER_GCOV) || defined(__VERIFIER_GCOV_MAP)
+extern void __gcov_reset(void);
+#endif
+
+static int persistent;
+static jmp_buf persistent_exit;
+static volatile int persistent_status;
+
+void _print_input_size();
+
+static void _exit_input(int status) {
+    if (persistent) {
+        persistent_status = status;
+        longjmp(persistent_exit, 1);
+    }
+    exit(status);
+}
+
+static void _discard_coverage() {
+    // the counters of an input that exits are not complete, it is run again in a fresh process
+#if defined(__VERIFIER_GCOV) || defined(__VERIFIER_GCOV_MAP)
+    __gcov_reset();
+#endif
+}
+
+#ifdef __VERIFIER_GCOV_MAP
+__attribute__((destructor)) static void _exit_coverage_map() {
+    if (!persistent) {
+        _dump_coverage_map();
+    }
+}
+#endif
+
+__attribute__((constructor)) static void _persistent(int argc, char **argv, char **envp) {
+    char *fds = getenv("__VERIFIER_PERSISTENT");
+    int control_fd, status_fd, request, status = 0;
+    pid_t pid = getpid();
+
+    if (fds == NULL || sscanf(fds, "%d,%d", &control_fd, &status_fd) != 2) {
+        return;
+    }
+    if (write(status_fd, &status, sizeof(status)) != sizeof(status)) {
+        return;
+    }
+    persistent = 1;
+    atexit(_discard_coverage);
+    while (read(control_fd, &request, sizeof(request)) == sizeof(request)) {
+        if (write(status_fd, &pid, sizeof(pid)) != sizeof(pid)) {
+            _exit(1);
+        }
+        input_size = 0;
+        input_types_size = 0;
+        if (setjmp(persistent_exit) == 0) {
+            persistent_status = main(argc, argv, envp) & 0xff;
+        }
+        if (input_size > 0) {
+            _print_input_size();
+        }
+        fflush(stdout);
+#ifdef __VERIFIER_GCOV
+        __gcov_dump();
+        __gcov_reset();
+#endif
+#ifdef __VERIFIER_GCOV_MAP
+        _dump_coverage_map();
+        __gcov_reset();
+#endif
+        status = persistent_status << 8;
+        if (write(status_fd, &status, sizeof(status)) != sizeof(status)) {
+            _exit(1);
+        }
+    }
+    _exit(0);
+}
+
 void __VERIFIER_error() {
-    exit(ERROR);
+    _exit_input(ERROR);
+}
+
+static void _record_type(char type) {
+    char *p;
+    if (input_types_size == input_types_capacity) {
+        p = realloc(input_types, input_types_capacity ? 2 * input_types_capacity : 64);
+        if (p == NULL) {
+            return;
+        }
+        input_types = p;
+        input_types_capacity = input_types_capacity ? 2 * input_types_capacity : 64;
+    }
+    input_types[input_types_size++] = type;
 }
 
 void _print_input_size(){
+    printf("t%.*s", (int) input_types_size, input_types);
     printf("n%d",input_size);
 }
 
-ssize_t _read (void * p, size_t n) {
-    if (input_size == 0) {
+ssize_t _read (void * p, size_t n, char type) {
+    if (input_size == 0 && !persistent) {
         atexit(_print_input_size);
     }
+    _record_type(type);
     input_size += n;
     return read(0, p, n);
 }
 
 char __VERIFIER_nondet_char() {
     char x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'c');
     // printf("  <input type=\"char\">%d</input>%ld</input size>\n", x, sizeof(x));
     return x;
 }
@@ -40,7 +340,8 @@ _Bool __VERIFIER_nondet_bool() {
     // _read(&x, sizeof(x));
     // // printf("  <input type=\"bool\">%d</input>%ld</input size>\n", x, sizeof(x));
     // return x;
-    char x = __VERIFIER_nondet_char();
+    char x = 0;
+    _read(&x, sizeof(x), 'b');
     if (x < 0) {
         return 0;
     } else {
@@ -50,28 +351,28 @@ _Bool __VERIFIER_nondet_bool() {
 
 unsigned char __VERIFIER_nondet_uchar() {
     unsigned char x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'C');
     // printf("  <input type=\"unsigned char\">%u</input>\n", x);
     return x;
 }
 
 short __VERIFIER_nondet_short() {
     short x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 's');
     // printf("  <input type=\"short\">%hi</input>\n", x);
     return x;
 }
 
 unsigned short __VERIFIER_nondet_ushort() {
     unsigned short x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'S');
     // printf("  <input type=\"unsigned short\">%hu</input>\n", x);
     return x;
 }
 
 unsigned long __VERIFIER_nondet_unsigned_long() {
     unsigned long x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'L');
     // printf("  <input type=\"unsigned long\">%lu</input>\n", x);
     return x;
 }
@@ -85,49 +386,49 @@ unsigned long __VERIFIER_nondet_unsigned_long() {
 
 long __VERIFIER_nondet_long() {
     long x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'l');
     // printf("  <input type=\"long\">%li</input>\n", x);
     return x;
 }
 
 unsigned int __VERIFIER_nondet_uint() {
     unsigned int x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'I');
     // printf("  <input type=\"unsigned int\">%u</input>\n", x);
     return x;
 }
 
 int __VERIFIER_nondet_int() {
     int x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'i');
     // printf("  <input type=\"int\">%d</input>\n", x);
     return x;
 }
 
 unsigned __VERIFIER_nondet_unsigned() {
     unsigned x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'u');
     // printf("  <input type=\"unsigned\">%d</input>\n", x);
     return x;
 }
 
 unsigned long __VERIFIER_nondet_ulong() {
     unsigned long x = 0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'L');
     // printf("  <input type=\"unsigned long\">%lu</input>\n", x);
     return x;
 }
 
 float __VERIFIER_nondet_float() {
     float x = 0.0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'f');
     // printf("  <input type=\"float\">%f</input>\n", x);
     return x;
 }
 
 double __VERIFIER_nondet_double() {
     double x = 0.0;
-    _read(&x, sizeof(x));
+    _read(&x, sizeof(x), 'd');
     // printf("  <input type=\"double\">%lf</input>\n", x);
     return x;
 }
@@ -147,6 +448,6 @@ void __VERIFIER_assume(int arg) {
         // printf("!!!arg: %d\n", arg);
         // printf("!!!!!!!!!!!!assume error\n");
         // __VERIFIER_assume(arg);
-        exit(ASSUME);
+        _exit_input(ASSUME);
     }
 }